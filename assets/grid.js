@@ -0,0 +1,23 @@
+// assets/grid.js
+
+window.dash_clientside = window.dash_clientside || {};
+window.dash_clientside.grid = {
+  // Expand a columnar store ({col: [values...]}) into AG-Grid rowData.
+  // Column keys travel once instead of once per row.
+  colsToRows: function(cols) {
+    if (!cols) {
+      return window.dash_clientside.no_update;
+    }
+    const keys = Object.keys(cols);
+    const n = keys.length > 0 ? cols[keys[0]].length : 0;
+    const rows = new Array(n);
+    for (let i = 0; i < n; i++) {
+      const row = {};
+      for (const k of keys) {
+        row[k] = cols[k][i];
+      }
+      rows[i] = row;
+    }
+    return rows;
+  }
+};
@@ -14,7 +14,7 @@ import pandas as pd
 from services.db import get_connection
 from services.logging_utils import log_msg
 from services.sql_core import get_events_shared
-from services.sql_filters import form_where_clause
+from services.sql_filters import build_where_sql
 from services.cached_funs import (
     get_retention_cohort_data_cached,
     get_shared_kpis_cached
@@ -46,15 +46,18 @@ def register_callbacks(app):
         avoid rerunning identical SQL.
         """
         log_msg("[CALLBACK:data] update_filtered_events() start")
-        where_clauses = form_where_clause(
-            country=country, genre=genre, artist=artist
+        where_sql, params = build_where_sql(
+            country=tuple(country or ()),
+            genre=tuple(genre or ()),
+            artist=tuple(artist or ()),
         )
-        log_msg(f"     Filters → {where_clauses}")
+        log_msg("     Filters → %s %s", args=(where_sql, params))
 
         new_hash = get_events_shared(
             conn = get_connection(),
-            where_clauses=tuple(where_clauses), 
-            previous_hash=prev_hash
+            where_clauses=where_sql,
+            previous_hash=prev_hash,
+            params=params
         )
 
         if new_hash == prev_hash:
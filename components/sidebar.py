@@ -65,15 +65,17 @@ def make_meta_row(
     Returns:
         dmc.Flex: Metadata row element.
     """
-    icon = DashIconify(icon=icon_name, style={"fontSize": font_size})
+    # One style dict shared by the icon and the text/link
+    style = {"fontSize": font_size}
+    icon = DashIconify(icon=icon_name, style=style)
 
     text_block = (
         dmc.Text([
             f"{label} ",
-            dmc.Anchor(content, href=link_url, target="_blank", style={"fontSize": font_size})
+            dmc.Anchor(content, href=link_url, target="_blank", style=style)
         ])
         if link_url else
-        dmc.Text(f"{label} {content}", style={"fontSize": font_size})
+        dmc.Text(f"{label} {content}", style=style)
     )
 
     return dmc.Flex(
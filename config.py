@@ -9,43 +9,46 @@ Central configuration for the Chinook dashboard, including:
 """
 
 import os
+from bisect import bisect_right
+from types import MappingProxyType
 
 env = os.getenv("DASH_ENV", "development").lower()
 ENABLE_LOGGING = env != "production"
 IS_DEV = env in ["development", "debug"]
 
+# Style tokens are read-only mappings; the theme gets a plain dict copy
 # Font sizes (responsive and rem-based)
-FONT_SIZES = {
+FONT_SIZES = MappingProxyType({
     "XS": "0.75rem",      # ~12px
     "SM": "0.875rem",     # ~14px
     "MD": "1rem",         # ~16px
     "LG": "1.125rem",     # ~18px
     "XL": "1.25rem"       # ~20px
-}
+})
 
 # Font weights
-FONT_WEIGHTS = {
+FONT_WEIGHTS = MappingProxyType({
     "NORMAL": 400,
     "MEDIUM": 500,
     "BOLD": 600,
     "EXTRA_BOLD": 700
-}
+})
 
 # Spacing units (px)
-SPACING = {
+SPACING = MappingProxyType({
     "XS": 4,
     "SM": 8,
     "MD": 12,
     "LG": 16,
     "XL": 24
-}
+})
 
 # Responsive breakpoints (px)
-BREAKPOINTS = {
+BREAKPOINTS = MappingProxyType({
     "MOBILE": 480,
     "TABLET": 768,
     "DESKTOP": 1024
-}
+})
 
 # GitHub metadata caching path
 CACHE_PATH = "data/last_commit_cache.json"
@@ -57,6 +60,10 @@ DEFAULT_COLORSCHEME = "light"
 DEFAULT_OFFSETS     = [3, 6, 9]
 DEFAULT_MAX_OFFSET  = None
 
+# Width thresholds and the font size used below, between and above them
+_FONT_BREAKPOINTS = (BREAKPOINTS["MOBILE"], BREAKPOINTS["TABLET"])
+_FONT_BY_BREAKPOINT = (FONT_SIZES["XS"], FONT_SIZES["SM"], FONT_SIZES["MD"])
+
 # Responsive font sizing utility
 def responsive_font_size(width: int) -> str:
     """
@@ -68,11 +75,7 @@ def responsive_font_size(width: int) -> str:
     Returns:
         str: Font size string
     """
-    if width < BREAKPOINTS["MOBILE"]:
-        return FONT_SIZES["XS"]
-    elif width < BREAKPOINTS["TABLET"]:
-        return FONT_SIZES["SM"]
-    return FONT_SIZES["MD"]
+    return _FONT_BY_BREAKPOINT[bisect_right(_FONT_BREAKPOINTS, width)]
 
 # Mantine theme generator
 def get_mantine_theme(color_scheme: str) -> dict:
@@ -90,7 +93,7 @@ def get_mantine_theme(color_scheme: str) -> dict:
     return {
         "colorScheme": color_scheme,
         "fontFamily": "'Inter', sans-serif",
-        "fontSizes": FONT_SIZES,
+        "fontSizes": dict(FONT_SIZES),
         "headings": {
             "fontFamily": "'Greycliff CF', sans-serif",
             "fontWeight": FONT_WEIGHTS["EXTRA_BOLD"],
@@ -7,14 +7,13 @@ Includes:
 - get_invoices_details(): overview-specific SQL for invoice-level results
 - get_genre_catalog(): review the genre_catalog temp table from DuckDB
 - get_artist_catalog(): review the artist_catalog temp table from DuckDB
-- make_serializable(): makes KPI bundles JSON serializable
 """
 
 import pandas as pd
 from duckdb import DuckDBPyConnection
 from services.db import get_connection
 from services.logging_utils import log_msg
-from services.sql_filters import apply_date_filter
+from services.sql_filters import INVOICE_DATE_WINDOW_SQL, invoice_date_window
 
 def get_filtered_data(date_range: list) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
@@ -43,6 +42,28 @@ def get_filtered_data(date_range: list) -> tuple[pd.DataFrame, pd.DataFrame]:
 
     return events_df, invoices_df
 
+# Invoices come from the filtered_invoices join; keyed by the date predicate
+# from invoice_date_window() ("" when undated), with the bounds bound at
+# execute time rather than formatted into the SQL
+_INVOICES_DETAILS_TEMPLATE = """
+    SELECT
+        i.InvoiceId,
+        i.CustomerId,
+        i.InvoiceDate,
+        i.BillingCountry,
+        i.Total
+    FROM filtered_invoices e
+    JOIN Invoice i ON i.InvoiceId = e.InvoiceId
+    {date_filter}
+"""
+
+_INVOICES_DETAILS_SQL = {
+    date_sql: _INVOICES_DETAILS_TEMPLATE.format(
+        date_filter=f"AND {date_sql}" if date_sql else ""
+    )
+    for date_sql in (INVOICE_DATE_WINDOW_SQL, "")
+}
+
 def get_invoices_details(conn: DuckDBPyConnection, date_range: list) -> pd.DataFrame:
     """
     Returns full invoice-level data scoped to filtered_invoices + date range.
@@ -56,20 +77,9 @@ def get_invoices_details(conn: DuckDBPyConnection, date_range: list) -> pd.DataF
     """
     log_msg(f"[PAGE-OVV-SQL] Running get_invoices_details for range: {date_range}")
 
-    join_clause = apply_date_filter(date_range)
-
-    query = f"""
-        SELECT
-            i.InvoiceId,
-            i.CustomerId,
-            i.InvoiceDate,
-            i.BillingCountry,
-            i.Total
-        FROM filtered_invoices e
-        {join_clause}
-    """
+    date_sql, params = invoice_date_window(date_range)
 
-    return conn.execute(query).fetchdf()
+    return conn.execute(_INVOICES_DETAILS_SQL[date_sql], params).fetchdf()
 
 def get_genre_catalog() -> pd.DataFrame:
     """
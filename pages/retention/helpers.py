@@ -33,6 +33,53 @@ __all__ = [
     "build_cohort_heatmap"
 ]
 
+# Static decay query; parameters are [start, end, max_offset]
+_DECAY_SQL = """
+WITH cohorts AS (
+    SELECT
+        CustomerId,
+        DATE_TRUNC('month', MIN(InvoiceDate)) AS cohort_start
+    FROM Invoice
+    GROUP BY CustomerId
+),
+activity AS (
+    SELECT
+        fi.CustomerId,
+        i.InvoiceDate,
+        DATE_TRUNC('month', c.cohort_start) AS cohort_month,
+        DATE_TRUNC('month', i.InvoiceDate) AS activity_month,
+        DATE_DIFF('month', c.cohort_start, i.InvoiceDate) AS month_offset
+    FROM filtered_invoices fi
+    JOIN Invoice i ON i.InvoiceId = fi.InvoiceId
+    JOIN cohorts c ON fi.CustomerId = c.CustomerId
+    WHERE DATE_DIFF('month', c.cohort_start, i.InvoiceDate) >= 0
+      AND fi.dt BETWEEN ? AND ?
+      AND DATE_DIFF('month', c.cohort_start, i.InvoiceDate) <= ?
+),
+retention AS (
+    SELECT 
+        month_offset,
+        COUNT(DISTINCT CustomerId) AS num_retained
+    FROM activity
+    GROUP BY month_offset
+),
+cohort_size AS (
+    SELECT COUNT(DISTINCT CustomerId) AS num_customers FROM activity
+)
+SELECT
+    r.month_offset,
+    r.num_retained,
+    cs.num_customers,
+    r.num_retained * 1.0 / cs.num_customers AS retention_rate
+FROM retention r, cohort_size cs
+WHERE r.month_offset > 0
+ORDER BY r.month_offset
+"""
+
+# Stand-in for "no offset cap" so the statement text never changes
+_NO_MAX_OFFSET = 9999
+
+
 def get_retention_decay_data(conn: duckdb.DuckDBPyConnection,
                     date_range: tuple[str, str],
                     max_offset: Optional[int] = None
@@ -65,62 +112,17 @@ def get_retention_decay_data(conn: duckdb.DuckDBPyConnection,
         date_bounds = conn.execute(bounds_sql).fetchdf()
         min_date = pd.to_datetime(date_bounds["min_date"].iloc[0])
         max_date = pd.to_datetime(date_bounds["max_date"].iloc[0])
-        max_offset = (max_date.year - min_date.year) * 12 + (max_date.month - min_date.month)
+        if pd.notna(min_date) and pd.notna(max_date):
+            max_offset = (max_date.year - min_date.year) * 12 + (max_date.month - min_date.month)
 
     # Format Dates for SQL
     start = pd.to_datetime(date_range[0]).date()
     end   = pd.to_datetime(date_range[1]).date()
 
-    # Compose & run the query
-    sql = f"""
-    WITH cohorts AS (
-        SELECT
-            CustomerId,
-            DATE_TRUNC('month', MIN(InvoiceDate)) AS cohort_start
-        FROM Invoice
-        GROUP BY CustomerId
-    ),
-    activity AS (
-        SELECT
-            fi.CustomerId,
-            i.InvoiceDate,
-            DATE_TRUNC('month', c.cohort_start) AS cohort_month,
-            DATE_TRUNC('month', i.InvoiceDate) AS activity_month,
-            DATE_DIFF('month', c.cohort_start, i.InvoiceDate) AS month_offset
-        FROM filtered_invoices fi
-        JOIN Invoice i ON i.InvoiceId = fi.InvoiceId
-        JOIN (
-            SELECT
-                CustomerId,
-                DATE_TRUNC('month', MIN(InvoiceDate)) AS cohort_start
-            FROM Invoice
-            GROUP BY CustomerId
-        ) c ON fi.CustomerId = c.CustomerId
-        WHERE DATE_DIFF('month', c.cohort_start, i.InvoiceDate) >= 0
-          AND fi.dt BETWEEN DATE '{start}' AND DATE '{end}'
-          {"AND DATE_DIFF('month', c.cohort_start, i.InvoiceDate) <= " + str(max_offset) if max_offset is not None else ""}
-    ),
-    retention AS (
-        SELECT 
-            month_offset,
-            COUNT(DISTINCT CustomerId) AS num_retained
-        FROM activity
-        GROUP BY month_offset
-    ),
-    cohort_size AS (
-        SELECT COUNT(DISTINCT CustomerId) AS num_customers FROM activity
-    )
-    SELECT
-        r.month_offset,
-        r.num_retained,
-        cs.num_customers,
-        r.num_retained * 1.0 / cs.num_customers AS retention_rate
-    FROM retention r, cohort_size cs
-    WHERE r.month_offset > 0
-    ORDER BY r.month_offset
-    """
-
-    df = conn.execute(sql).fetchdf()
+    df = conn.execute(
+        _DECAY_SQL,
+        [start, end, max_offset if max_offset is not None else _NO_MAX_OFFSET]
+    ).fetchdf()
     log_msg(f"[SQL - DECAY] Retention Decay query returned {len(df)} rows.")
     return df
 
@@ -307,8 +309,12 @@ def build_cohort_heatmap(
                  on=["cohort_month", "month_offset"])
     )
 
-    # Labels & hover text
-    full_df["CohortLabel"] = full_df["cohort_month"].dt.strftime("%b %Y")
+    # Labels & hover text: one strftime per cohort, broadcast across offsets
+    n_c, n_m = len(cohort_range), len(month_range)
+    cohort_labels = np.array([ts.strftime("%b %Y") for ts in cohort_range])
+    full_df["CohortLabel"] = np.broadcast_to(
+        cohort_labels[:, None], (n_c, n_m)
+        ).ravel()
     full_df["hover_text"] = np.where(
         full_df["retention_pct"].notna(),
         "Cohort: "    + full_df["CohortLabel"] +
@@ -321,20 +327,11 @@ def build_cohort_heatmap(
         "<br>No data"
     )
 
-    # Pivot to matrices
-    z = full_df.pivot(
-        index="CohortLabel",
-        columns="month_offset",
-        values="retention_pct"
-        ).values
-    t = full_df.pivot(
-        index="CohortLabel",
-        columns="month_offset",
-        values="hover_text"
-        ).values
-    x = sorted(full_df["month_offset"].unique())
-    y = sorted(full_df["CohortLabel"].unique(),
-               key=lambda lbl: pd.to_datetime(lbl, format="%b %Y"))
+    # Reshape to matrices (full_df rows follow the cohort × offset product)
+    z = full_df["retention_pct"].to_numpy().reshape(n_c, n_m)
+    t = full_df["hover_text"].to_numpy().reshape(n_c, n_m)
+    x = list(month_range)
+    y = cohort_labels.tolist()
 
     # Build heatmap
     fig = Figure(
@@ -8,23 +8,28 @@ Callbacks include:
   - Time-series data table refresh
   - KPI cards update
   - Metric plot rendering
+  - Columnar grid data expanded client-side (assets/grid.js)
   - CSV download and button toggle
 
 Public API:
   - register_callbacks(app)
 """
 
+import csv
+import io
 from datetime import date
 from typing import Any, Dict, List, Tuple
 
-import pandas as pd
-from dash import Dash, Input, Output, State, dcc
+import numpy as np
+from dash import ClientsideFunction, Dash, Input, Output, State, dcc
 from dash.exceptions import PreventUpdate
 
 from config import get_mantine_theme
 from pages.timeseries.helpers import (
     get_ts_monthly_summary_cached,
+    get_ts_plot_payload,
     build_ts_plot,
+    build_ts_theme_patch,
 )
 from services.display_utils import make_static_kpi_card
 from services.logging_utils import log_msg
@@ -32,6 +37,110 @@ from services.logging_utils import log_msg
 
 __all__ = ["register_callbacks"]
 
+# AG-Grid columns for the (fixed) get_ts_monthly_summary schema
+_TS_COLDEFS = [
+    {"field": c, "headerName": c, "sortable": True, "filter": True}
+    for c in (
+        "month", "num_purchases", "num_customers",
+        "tracks_sold", "revenue", "first_time_customers"
+    )
+]
+
+
+def _ts_column_lists(ts_cols: Dict[str, np.ndarray]) -> Dict[str, List[Any]]:
+    """
+    Convert the cached time-series arrays into plain Python lists.
+
+    Parameters:
+        ts_cols: Column arrays from get_ts_monthly_summary_cached.
+
+    Returns:
+        Dict of column name -> list, with months formatted as 'YYYY-MM'.
+    """
+    return {
+        c: np.datetime_as_string(v, unit="M").tolist()
+        if c == "month" else v.tolist()
+        for c, v in ts_cols.items()
+    }
+
+
+def _build_ts_kpi_cards(dynamic_kpis: Dict[str, Any]) -> List[Any]:
+    """
+    Build the revenue, purchases, and customers KPI cards.
+
+    Parameters:
+        dynamic_kpis: Dict containing 'metadata_kpis' with formatted values.
+
+    Returns:
+        A list of Dash components representing KPI cards.
+    """
+    # Declare content of cards
+    revenue_specs = [
+    { "label": "Total",
+        "key_path": ["metadata_kpis", "revenue_total_fmt"],
+        "fmt": True,
+        "tooltip": "Total revenue." },
+    { "label": "Avg / Month",
+        "key_path": ["metadata_kpis", "revenue_per_month"],
+        "fmt": True,
+        "tooltip": "Average revenue per month." }
+    ]
+
+    purchase_specs = [
+    { "label": "Purchases",
+        "key_path": ["metadata_kpis", "purchases_num"],
+        "fmt": True,
+        "tooltip": "Total number of unique purchase events." },
+    { "label": "Tracks Sold",
+        "key_path": ["metadata_kpis", "tracks_sold_num"],
+        "fmt": True,
+        "tooltip": "Total unit sales." },
+    { "label": "Avg $ / Purchase",
+        "key_path": ["metadata_kpis", "revenue_per_purchase"],
+        "fmt": True,
+        "tooltip": "Average revenue per purchase." }
+    ]
+
+    customer_specs = [
+    { "label": "Total",
+        "key_path": ["metadata_kpis", "cust_num"],
+        "fmt": True,
+        "tooltip": "Total unique customers." },
+    { "label": "First-Time",
+        "key_path": ["metadata_kpis", "cust_per_new"],
+        "fmt": True,
+        "tooltip": "(%) First-time customers." }
+    ]
+
+    # Build cards with a single call each
+    cards = [
+    make_static_kpi_card(
+        kpi_bundle=dynamic_kpis,
+        specs=revenue_specs,
+        title="Revenue",
+        icon="tdesign:money",
+        tooltip="Gross revenue, US Dollars."
+    ),
+
+    make_static_kpi_card(
+        kpi_bundle=dynamic_kpis,
+        specs=purchase_specs,
+        title="Purchases",
+        icon="carbon:receipt",
+        tooltip="Purchase patterns."
+    ),
+
+    make_static_kpi_card(
+        kpi_bundle=dynamic_kpis,
+        specs=customer_specs,
+        title="Customers",
+        icon="mdi:people-outline",
+        tooltip="Customer overview."
+    ),
+    ]
+
+    return cards
+
 
 def register_callbacks(app: Dash) -> None:
     """
@@ -57,190 +166,170 @@ def register_callbacks(app: Dash) -> None:
         Returns:
             The same CSS class name to apply to the grid container.
         """
-        log_msg(f"[CALLBACK:timeseries] Updated grid theme: {grid_class}")
+        log_msg("[CALLBACK:timeseries] Updated grid theme: %s", args=(grid_class,))
         return grid_class
 
 
     @app.callback(
         Output("ts-data-scroll", "columnDefs"),
-        Output("ts-data-scroll", "rowData"),
+        Output("ts-data-cols", "data"),
         Input("events-shared-fingerprint", "data"),
         Input("date-range-store", "data"),
     )
     def update_ts(
         events_hash: str,
         date_range: Tuple[str, str],
-    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, List[Any]]]:
         """
-        Refresh the time-series DataFrame and push to AG-Grid.
+        Refresh the time-series data and push it toward AG-Grid.
+
+        Data is sent column-wise to `ts-data-cols`; a clientside callback
+        expands it into the grid's rowData.
 
         Parameters:
             events_hash: Unique fingerprint for current filters.
             date_range: Tuple of two 'YYYY-MM-DD' strings.
 
         Returns:
-            A tuple of (columnDefs, rowData) for AG-Grid.
+            A tuple of (columnDefs, column lists) for AG-Grid.
         """
         if not events_hash or not date_range:
             raise PreventUpdate
 
-        log_msg("[CALLBACK:timeseries] - Callback active.")
+        ts_cols = get_ts_monthly_summary_cached(events_hash, tuple(date_range))
 
-        ts_df = get_ts_monthly_summary_cached(events_hash, date_range)
-        ts_df_coldefs = [
-            {"field": c, "headerName": c, "sortable": True, "filter": True} 
-            for c in ts_df.columns
-            ]
+        columns = _ts_column_lists(ts_cols)
 
-        log_msg("[CALLBACK:timeseries] Time Series dashboard data refreshed")
-        log_msg(f"     [CALLBACK:timeseries] Data Table Rows = {len(ts_df)}")
+        log_msg(
+            "[CALLBACK:timeseries] Time Series data refreshed (%d rows)",
+            args=(len(columns["month"]),)
+            )
 
         return (
-            ts_df_coldefs, ts_df.to_dict("records")
+            _TS_COLDEFS, columns
         )
 
 
+    # Expand the columnar store into AG-Grid rowData in the browser
+    app.clientside_callback(
+        ClientsideFunction(namespace="grid", function_name="colsToRows"),
+        Output("ts-data-scroll", "rowData"),
+        Input("ts-data-cols", "data"),
+    )
+
+
     @app.callback(
         Output("ts-kpi-cards", "children"),
-        Input("kpis-store", "data"),
+        Output("ts-last-kpis-hash", "data"),
         Input("kpis-fingerprint", "data"),
+        State("kpis-store", "data"),
+        State("ts-last-kpis-hash", "data"),
     )
     def update_ts_kpis(
-        dynamic_kpis: Dict[str, Any],
         dynamic_kpis_hash: str,
-    ) -> List[Any]:
+        dynamic_kpis: Dict[str, Any],
+        rendered_hash: str,
+    ) -> Tuple[List[Any], str]:
         """
         Build and return KPI cards for revenue, purchases, and customers.
 
+        Skips the update if the cards already show this fingerprint.
+
         Parameters:
+            dynamic_kpis_hash: Fingerprint for the KPI set.
             dynamic_kpis: Dict containing 'metadata_kpis' with formatted values.
-            dynamic_kpis_hash: Fingerprint for the KPI set (unused).
+            rendered_hash: Fingerprint of the cards currently on the page.
 
         Returns:
-            A list of Dash components representing KPI cards.
+            A list of Dash components representing KPI cards, and the
+            fingerprint they were built from.
         """
+        if not dynamic_kpis_hash or not dynamic_kpis:
+            raise PreventUpdate
+        if dynamic_kpis_hash == rendered_hash:
+            raise PreventUpdate
+
         log_msg("[CALLBACK:timeseries] Updating KPI cards.")
-        
-        # Declare content of cards
-        revenue_specs = [
-        { "label": "Total",
-            "key_path": ["metadata_kpis", "revenue_total_fmt"],
-            "fmt": True,
-            "tooltip": "Total revenue." },
-        { "label": "Avg / Month",
-            "key_path": ["metadata_kpis", "revenue_per_month"],
-            "fmt": True,
-            "tooltip": "Average revenue per month." }
-        ]
-
-        purchase_specs = [
-        { "label": "Purchases",
-            "key_path": ["metadata_kpis", "purchases_num"],
-            "fmt": True,
-            "tooltip": "Total number of unique purchase events." },
-        { "label": "Tracks Sold",
-            "key_path": ["metadata_kpis", "tracks_sold_num"],
-            "fmt": True,
-            "tooltip": "Total unit sales." },
-        { "label": "Avg $ / Purchase",
-            "key_path": ["metadata_kpis", "revenue_per_purchase"],
-            "fmt": True,
-            "tooltip": "Average revenue per purchase." }
-        ]
-
-        customer_specs = [
-        { "label": "Total",
-            "key_path": ["metadata_kpis", "cust_num"],
-            "fmt": True,
-            "tooltip": "Total unique customers." },
-        { "label": "First-Time",
-            "key_path": ["metadata_kpis", "cust_per_new"],
-            "fmt": True,
-            "tooltip": "(%) First-time customers." }
-        ]
-
-        # Build cards with a single call each
-        cards = [
-        make_static_kpi_card(
-            kpi_bundle=dynamic_kpis,
-            specs=revenue_specs,
-            title="Revenue",
-            icon="tdesign:money",
-            tooltip="Gross revenue, US Dollars."
-        ),
-
-        make_static_kpi_card(
-            kpi_bundle=dynamic_kpis,
-            specs=purchase_specs,
-            title="Purchases",
-            icon="carbon:receipt",
-            tooltip="Purchase patterns."
-        ),
-
-        make_static_kpi_card(
-            kpi_bundle=dynamic_kpis,
-            specs=customer_specs,
-            title="Customers",
-            icon="mdi:people-outline",
-            tooltip="Customer overview."
-        ),
-        ]
-
-        return cards
+        return _build_ts_kpi_cards(dynamic_kpis), dynamic_kpis_hash
 
 
     @app.callback(
         Output("download-ts-csv", "data"),
         Input("btn-download-ts", "n_clicks"),
-        State("ts-data-scroll", "rowData"),
+        State("events-shared-fingerprint", "data"),
+        State("date-range-store", "data"),
         prevent_initial_call=True,
     )
     def download_ts_csv_from_grid(
         n_clicks: int,
-        row_data: List[Dict[str, Any]],
+        events_hash: str,
+        date_range: Tuple[str, str],
     ) -> Any:
         """
-        Serialize the AG-Grid rowData to CSV and trigger download.
+        Serialize the grid's time-series data to CSV and trigger download.
+
+        The rows are re-read from the cached summary (same key as the grid)
+        rather than round-tripping the grid's rowData from the client.
 
         Parameters:
             n_clicks: Number of download button clicks.
-            row_data: Current rowData from the grid.
+            events_hash: Unique fingerprint for current filters.
+            date_range: Tuple of two 'YYYY-MM-DD' strings.
 
         Returns:
-            A `dcc.send_data_frame` payload to prompt CSV download.
+            A `dcc.send_string` payload to prompt CSV download.
         """
-        if not row_data:
+        if not events_hash or not date_range:
             raise PreventUpdate
 
-        df = pd.DataFrame(row_data)
+        columns = _ts_column_lists(
+            get_ts_monthly_summary_cached(events_hash, tuple(date_range))
+            )
+        if not columns["month"]:
+            raise PreventUpdate
+
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(columns)
+        writer.writerows(zip(*columns.values()))
+
         today_str = date.today().strftime("%Y_%m_%d")
         filename = f"chinook_ts_{today_str}.csv"
 
         log_msg("[CALLBACK:timeseries] Download processing.")
 
-        return dcc.send_data_frame(df.to_csv, filename=filename, index=False)
+        return dcc.send_string(buf.getvalue(), filename=filename)
 
 
     @app.callback(
         Output("btn-download-ts", "disabled"),
         Output("btn-download-ts", "children"),
         Output("btn-download-ts", "style"),
-        Input("ts-data-scroll", "rowData"),
+        Input("ts-data-cols", "data"),
+        State("btn-download-ts", "disabled"),
     )
     def toggle_download_btn(
-        row_data: List[Dict[str, Any]],
+        ts_cols: Dict[str, List[Any]],
+        is_disabled: bool,
     ) -> Tuple[bool, str, Dict[str, Any]]:
         """
-        Enable or disable the download button based on rowData presence.
+        Enable or disable the download button based on grid data presence.
 
         Parameters:
-            row_data: The current AG-Grid rowData list.
+            ts_cols: The columnar grid data from ts-data-cols.
+            is_disabled: The button's current disabled flag.
 
         Returns:
             disabled flag, button label, and style dict.
         """
+        has_rows = bool(ts_cols and ts_cols.get("month"))
+
+        # Label and style follow the flag, so no change means nothing to send
+        if bool(is_disabled) == (not has_rows):
+            raise PreventUpdate
+
         # If no rows: disable & show alternate text
-        if not row_data or len(row_data) == 0:
+        if not has_rows:
             disabled = True
             label    = "No data in range to download"
             style    = {"opacity": "0.5", "cursor": "not-allowed"}
@@ -255,43 +344,38 @@ def register_callbacks(app: Dash) -> None:
 
     @app.callback(
         Output("ts-metric-plot", "figure"),
-        Input("ts-data-scroll", "rowData"),
+        Input("events-shared-fingerprint", "data"),
+        Input("date-range-store", "data"),
         Input("metric-store", "data"),
         Input("metric-label-store", "data"),
-        Input("theme-store", "data"),
-        State("date-range-store", "data"),
-        State("events-shared-fingerprint", "data"),
+        State("theme-store", "data"),
     )
     def render_ts_plot(
-        ts_df: Dict,
+        events_hash: str,
+        date_range: Tuple[str, str],
         metric_value: str,
         metric_label: str,
         theme_style: Dict[str, Any],
-        date_range: Tuple[str, str],
-        events_hash: str,
     ) -> Any:
         """
         Generate and return a Time Series Plotly figure for the selected metric.
 
         Parameters:
-            ts_df: TS DataFrame (Dict stored format)
-            metric_value: Column name in the TS DataFrame.
+            events_hash: Filter fingerprint.
+            date_range: Tuple of two 'YYYY-MM-DD' strings.
+            metric_value: KPI column to plot.
             metric_label: Axis label for the plot.
             theme_style: Dict containing Mantine theme data.
-            date_range: Tuple of two 'YYYY-MM-DD' strings.
-            events_hash: Filter fingerprint.
             
         Returns:
             A Plotly Figure object.
         """
-        if not events_hash or not metric_value or not ts_df:
+        if not events_hash or not date_range or not metric_value:
             raise PreventUpdate
 
         log_msg("[CALLBACK:timeseries] Updating Plot.")
 
-        ts_df = pd.DataFrame.from_dict(ts_df)
-
-        log_msg(f"    [CALLBACK:timeseries] Read in TS DF with {len(ts_df)} rows")
+        payload = get_ts_plot_payload(events_hash, tuple(date_range))
 
         metric_dict = {
             "var_name": metric_value,
@@ -308,6 +392,36 @@ def register_callbacks(app: Dash) -> None:
 
         log_msg("   [CALLBACK:timeseries] Rendering plot.")
 
-        fig = build_ts_plot(ts_df, metric_dict, theme_info)
+        fig = build_ts_plot(payload, metric_dict, theme_info)
+
+        return fig
+
+
+    @app.callback(
+        Output("ts-metric-plot", "figure", allow_duplicate=True),
+        Input("theme-store", "data"),
+        prevent_initial_call=True,
+    )
+    def restyle_ts_plot(theme_style: Dict[str, Any]) -> Any:
+        """
+        Patch the Time Series figure template when only the theme changes.
+
+        Parameters:
+            theme_style: Dict containing Mantine theme data.
+
+        Returns:
+            A Dash Patch updating the figure layout in place.
+        """
+        if not theme_style or "color_scheme" not in theme_style:
+            raise PreventUpdate
+
+        log_msg("[CALLBACK:timeseries] Patching plot theme.")
+
+        theme_data = get_mantine_theme(theme_style["color_scheme"])
+
+        theme_info = {
+            "plotlyTemplate": theme_data.get("plotlyTemplate", "plotly_white"),
+            "fontFamily": theme_data.get("fontFamily", "Inter"),
+        }
 
-        return fig
\ No newline at end of file
+        return build_ts_theme_patch(theme_info)
@@ -7,13 +7,18 @@ from DuckDB and building Plotly figures for visualization.
 Functions:
     - get_ts_monthly_summary: raw SQL query for monthly KPIs.
     - get_ts_monthly_summary_cached: memoized wrapper around the raw query.
-    - build_ts_plot: constructs a Plotly Figure from KPI DataFrame.
+    - get_ts_plot_payload: memoized, plot-ready arrays for the metric chart.
+    - build_ts_plot: constructs a Plotly Figure from the plot payload.
+    - build_ts_theme_patch: partial figure update for theme-only changes.
 
 """
 from typing import Tuple, Dict, List
 from duckdb import DuckDBPyConnection
+import numpy as np
 import pandas as pd
 import dash_mantine_components as dmc
+import plotly.io as pio
+from dash import Patch
 from plotly.graph_objects import Figure, Scatter
 
 from services.db import get_connection
@@ -26,23 +31,28 @@ dmc.add_figure_templates()
 __all__ = [
     "get_ts_monthly_summary",
     "get_ts_monthly_summary_cached",
+    "get_ts_plot_payload",
     "build_ts_plot",
+    "build_ts_theme_patch",
 ]
 
 def get_ts_monthly_summary(
         conn: DuckDBPyConnection, 
         date_range: List[str]
-) -> pd.DataFrame:
+) -> Dict[str, np.ndarray]:
     """
     Queries the filtered_invoices temp table in DuckDB and returns monthly KPIs.
 
+    The result is kept columnar (DuckDB's native NumPy output) so it caches
+    and pickles as a handful of flat arrays rather than a pandas frame.
+
     Parameters:
         conn (duckdb.DuckDBPyConnection): Active DuckDB connection.
         date_range (List[str]): List of two 'YYYY-MM-DD' strings defining date bounds.
 
     Returns:
-        A pandas DataFrame with columns:
-            - month (str, 'YYYY-MM')
+        A dict of equal-length NumPy arrays, keyed by column, in order:
+            - month (datetime64[M])
             - num_purchases (int)
             - num_customers (int)
             - tracks_sold (int)
@@ -54,57 +64,71 @@ def get_ts_monthly_summary(
 
     log_msg("[SQL-TS] get_ts_monthly_summary(): querying pre-aggregated KPIs.")
 
-    query = f"""
+    query = """
         WITH first_invoices AS (
             SELECT 
                 CustomerId,
-                MIN(dt) AS first_invoice_date
+                MIN(month_start) AS first_month
             FROM filtered_invoices
             GROUP BY CustomerId
         ),
-        invoice_expanded AS (
+        first_time AS (
+            SELECT
+                first_month AS month_start,
+                COUNT(*) AS first_time_customers
+            FROM first_invoices
+            GROUP BY first_month
+        ),
+        per_invoice AS (
             SELECT 
-                fi.CustomerId,
                 fi.InvoiceId,
-                fi.dt AS invoice_date,
-                STRFTIME(fi.dt, '%Y-%m') AS month,
-                i.BillingCountry,
-                i.BillingState,
-                il.Quantity,
-                il.UnitPrice,
-                CASE 
-                    WHEN STRFTIME(fi.dt, '%Y-%m') = STRFTIME(fi2.first_invoice_date, '%Y-%m') THEN 1
-                    ELSE 0
-                END AS first_time_flag
+                fi.CustomerId,
+                fi.month_start,
+                SUM(il.Quantity) AS qty,
+                SUM(il.Quantity * il.UnitPrice) AS rev
             FROM filtered_invoices fi
-            JOIN Invoice i ON fi.InvoiceId = i.InvoiceId
-            JOIN InvoiceLine il ON i.InvoiceId = il.InvoiceId
-            JOIN first_invoices fi2 ON fi.CustomerId = fi2.CustomerId
-            WHERE DATE(fi.dt) BETWEEN DATE('{date_range[0]}') AND DATE('{date_range[1]}')
+            JOIN InvoiceLine il ON fi.InvoiceId = il.InvoiceId
+            WHERE fi.dt BETWEEN ?::DATE AND ?::DATE
+            GROUP BY fi.InvoiceId, fi.CustomerId, fi.month_start
+        ),
+        monthly AS (
+            SELECT 
+                month_start,
+                COUNT(*) AS num_purchases,
+                COUNT(DISTINCT CustomerId) AS num_customers,
+                SUM(qty) AS tracks_sold,
+                SUM(rev) AS revenue
+            FROM per_invoice
+            GROUP BY month_start
         )
         SELECT 
-            month,
-            COUNT(DISTINCT InvoiceId) AS num_purchases,
-            COUNT(DISTINCT CustomerId) AS num_customers,
-            SUM(Quantity) AS tracks_sold,
-            SUM(UnitPrice * Quantity) AS revenue,
-            COUNT(DISTINCT CASE WHEN first_time_flag = 1 THEN CustomerId END) AS first_time_customers
-        FROM invoice_expanded
-        GROUP BY month
-        ORDER BY month
+            m.month_start AS month,
+            m.num_purchases,
+            m.num_customers,
+            m.tracks_sold,
+            m.revenue,
+            COALESCE(ft.first_time_customers, 0) AS first_time_customers
+        FROM monthly m
+        LEFT JOIN first_time ft ON m.month_start = ft.month_start
+        ORDER BY m.month_start
     """
 
-    df = conn.execute(query).fetchdf()
+    cols = conn.execute(query, [date_range[0], date_range[1]]).fetchnumpy()
+    # Month precision keeps every column a flat, fixed-width buffer, so the
+    # memoized payload pickles as raw memory (no per-row string objects)
+    cols["month"] = cols["month"].astype("datetime64[M]")
 
-    log_msg(f"[SQL - TS] get_ts_monthly_summary(): retrieved rows: {len(df)}")
+    log_msg(
+        f"[SQL - TS] get_ts_monthly_summary(): retrieved rows: {len(cols['month'])}"
+        )
         
-    return df
+    return cols
 
 @cache.memoize()
 def get_ts_monthly_summary_cached(
     events_hash: str,
     date_range: Tuple[str, ...]
-) -> pd.DataFrame:
+) -> Dict[str, np.ndarray]:
     """
     Memoized wrapper for `get_ts_monthly_summary`.
 
@@ -116,28 +140,72 @@ def get_ts_monthly_summary_cached(
         date_range:  Tuple of two 'YYYY-MM-DD' date strings.
 
     Returns:
-        DataFrame: Same structure as `get_ts_monthly_summary`.
+        Dict of column arrays: Same structure as `get_ts_monthly_summary`.
     """
-    df = get_ts_monthly_summary(
+    cols = get_ts_monthly_summary(
         conn=get_connection(),
         date_range=list(date_range)
     )
 
-    return df
+    return cols
+
+
+# Hover columns, in the order referenced by build_ts_plot's hovertemplate
+_TS_HOVER_COLS = (
+    "revenue", "num_purchases", "tracks_sold",
+    "num_customers", "first_time_customers",
+)
+
+
+@cache.memoize()
+def get_ts_plot_payload(
+    events_hash: str,
+    date_range: Tuple[str, ...]
+) -> Dict[str, np.ndarray]:
+    """
+    Memoized, plot-ready arrays for the time-series metric chart.
+
+    Everything that does not depend on the selected metric or theme is
+    derived once per filter state, so switching either is a lookup.
+
+    Parameters:
+        events_hash: A unique hash representing current filter state.
+        date_range:  Tuple of two 'YYYY-MM-DD' date strings.
+
+    Returns:
+        Dict with 'x' (datetime64[ms] month starts), 'customdata'
+        (float32 matrix of hover values, incl. revenue per customer),
+        and one array per metric column.
+    """
+    cols = get_ts_monthly_summary_cached(events_hash, date_range)
+
+    rev_per_cust = cols["revenue"] / cols["num_customers"]
+    # float32 halves the typed-array payload; counts stay exact below 2**24
+    # and the hovertemplate only shows money to two decimals
+    customdata = np.column_stack(
+        [cols[c] for c in _TS_HOVER_COLS] + [rev_per_cust]
+        ).astype(np.float32)
+
+    payload = {c: cols[c] for c in cols if c != "month"}
+    payload["x"] = cols["month"].astype("datetime64[ms]")
+    payload["customdata"] = customdata
+
+    return payload
 
 
 def build_ts_plot(
-    df: pd.DataFrame,
+    payload: Dict[str, np.ndarray],
     metric: Dict[str, str],
     theme: Dict[str, str]
 ) -> Figure:
     """
-    Build a time-series line chart for a given KPI DataFrame.
+    Build a time-series line chart for a given KPI payload.
 
     Parameters:
-        df: DataFrame with a 'month' column and KPI columns.
+        payload: Dict from `get_ts_plot_payload` ('x', 'customdata' and
+            one array per KPI column).
         metric: Dict with keys:
-            - 'var_name': column name in df to plot (e.g., 'revenue')
+            - 'var_name': payload key to plot (e.g., 'revenue')
             - 'label': human-friendly axis label (e.g., 'Revenue')
         theme: Dict with optional keys:
             - 'plotlyTemplate': Plotly template name (default 'plotly_white')
@@ -145,7 +213,7 @@ def build_ts_plot(
 
     Returns:
         A Plotly Figure object, either with a line+marker trace
-        or a "no data" annotation if the DataFrame is empty.
+        or a "no data" annotation if the payload is empty.
     """
     var, lab = metric["var_name"], metric["label"]
 
@@ -153,9 +221,10 @@ def build_ts_plot(
     font_family = theme.get("fontFamily", "Inter")
 
     fig = Figure()
+    y = payload.get(var)
 
     # Fallback for empty data set
-    if df.empty or df[var].isna().all():
+    if y is None or len(y) == 0 or pd.isna(y).all():
         fig.add_annotation(
             text="No data available for selected filters",
             xref="paper", yref="paper",
@@ -173,9 +242,6 @@ def build_ts_plot(
         fig.update_yaxes(visible=False)
         return fig
 
-    df["month_fmt"] = pd.to_datetime(df["month"])
-    df["rev_per_cust"] = df["revenue"] / df["num_customers"]
-
     hover = (
         "Month: %{x|%b %Y}<br>"
         "Revenue: $%{customdata[0]:,.2f}<br>"
@@ -187,15 +253,12 @@ def build_ts_plot(
     )
 
     fig.add_trace(Scatter(
-        x=df["month_fmt"],
-        y=df[var],
+        x=payload["x"],
+        y=y,
         mode="lines+markers",
         line=dict(width=2),
         marker=dict(size=6),
-        customdata=df[[
-            "revenue", "num_purchases", "tracks_sold",
-            "num_customers", "first_time_customers", "rev_per_cust"
-        ]],
+        customdata=payload["customdata"],
         hovertemplate=hover, name = "",
         showlegend=False
     ))
@@ -212,3 +275,29 @@ def build_ts_plot(
     )
 
     return fig
+
+
+def build_ts_theme_patch(theme: Dict[str, str]) -> Patch:
+    """
+    Build a partial figure update that restyles an existing time-series plot.
+
+    Only the template and font family change with the theme, so the traces
+    already on the client are left untouched.
+
+    Parameters:
+        theme: Dict with optional keys:
+            - 'plotlyTemplate': Plotly template name (default 'plotly_white')
+            - 'fontFamily': font family for all text (default 'Inter')
+
+    Returns:
+        A Dash Patch targeting the figure layout.
+    """
+    template = theme.get("plotlyTemplate", "plotly_white")
+    font_family = theme.get("fontFamily", "Inter")
+
+    patch = Patch()
+    # Plotly.js cannot resolve template names, so send the full template
+    patch["layout"]["template"] = pio.templates[template].to_plotly_json()
+    patch["layout"]["font"]["family"] = font_family
+
+    return patch
@@ -9,6 +9,9 @@ from dash_iconify import DashIconify
 
 def layout():
     return html.Div([
+        # Fingerprint of the KPI set currently rendered in the cards
+        dcc.Store(id="ts-last-kpis-hash", storage_type="memory"),
+
         # KPI Cards
         html.Div(
             [
@@ -57,6 +60,8 @@ def layout():
         dmc.Title("Scrollable Data Table", order = 4, ta="center"),
         dmc.Space(h=10),
 
+        # Columnar grid data; expanded to rowData client-side (assets/grid.js)
+        dcc.Store(id="ts-data-cols", storage_type="memory"),
         dag.AgGrid(
             id="ts-data-scroll",
             columnDefs=[], rowData=[],
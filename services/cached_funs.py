@@ -3,6 +3,7 @@ Cached wrappers for core service functions.
 
 This module provides memoized versions of:
   - get_retention_cohort_data
+  - get_group_kpis_all
   - get_shared_kpis
 
 Each wrapper builds cache keys from simple, hashable inputs and
@@ -16,6 +17,7 @@ from services.cache_config import cache
 from services.db import get_connection
 from services.sql_core import hash_dataframe, hash_kpi_bundle
 from services.kpis.shared import get_shared_kpis as _get_shared_kpis
+from services.kpis.group import get_group_kpis_all as _get_group_kpis_all
 from services.kpis.retention import get_retention_cohort_data as \
     _get_retention_cohort_data
 from services.metadata import get_filter_metadata
@@ -53,6 +55,29 @@ def get_retention_cohort_data_cached(
     return df, signature
 
 
+@cache.memoize()
+def get_group_kpis_all_cached(
+    events_hash: str,
+    date_range: Tuple[str, str],
+) -> Dict[str, pd.DataFrame]:
+    """
+    Return full group KPIs for Genre, Artist and BillingCountry, memoized
+    by the filtered events and date range.
+
+    Keyed separately from get_shared_kpis_cached so that changing only the
+    cohort offsets reuses the group aggregation.
+
+    Parameters:
+        events_hash: hash of the filtered events table.
+        date_range: tuple of [start_date, end_date] strings.
+
+    Returns:
+        Dict of group_var -> DataFrame, as get_group_kpis_all().
+    """
+    conn = get_connection()
+    return _get_group_kpis_all(conn=conn, date_range=list(date_range))
+
+
 @cache.memoize()
 def get_shared_kpis_cached(
     events_hash: str,
@@ -80,6 +105,10 @@ def get_shared_kpis_cached(
         date_range=date_range,
         max_offset=max_offset
     )
+    group_kpis = get_group_kpis_all_cached(
+        events_hash=events_hash,
+        date_range=date_range,
+    )
 
     bundle = _get_shared_kpis(
         conn=conn,
@@ -88,6 +117,7 @@ def get_shared_kpis_cached(
         cohort_df=cohort_df,
         top_n=5,
         offsets=list(offsets),
+        group_kpis=group_kpis,
     )
 
     kpi_hash = hash_kpi_bundle(bundle)
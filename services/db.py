@@ -4,20 +4,49 @@ db.py
 Manages persistent connection logic to the Chinook DuckDB database.
 Ensures safe and read-only access with resilient path resolution,
 and maintains a single connection instance for temp table visibility across modules.
+
+Queries that only read base tables can borrow a duplicated cursor from a
+small pool (`borrow_cursor`) so they do not queue behind the shared connection.
 """
 
 import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
 import duckdb
 from services.logging_utils import log_msg
 from duckdb import DuckDBPyConnection
 
+# Resolved once at import; `chinook.duckdb` lives in `/data/` at the project root
+_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "chinook.duckdb"
+)
+
+# Session settings applied once to the parent connection (cursors inherit them).
+# External file/network access is off: the app only reads the local database
+# (plus the session's own temp tables).
+_SESSION_SETTINGS = {
+    "threads": os.cpu_count() or 1,
+    "enable_external_access": "false",
+}
+
 # Persistent connection cache
 _conn: DuckDBPyConnection | None = None
+# Guards first-time creation so concurrent callbacks cannot open two handles
+_conn_lock = threading.Lock()
+
+# Duplicated cursors of `_conn` for base-table-only reads
+_CURSOR_POOL_SIZE = 4
+_cursor_pool: "queue.Queue[DuckDBPyConnection] | None" = None
 
 def get_connection() -> DuckDBPyConnection:
     """
     Returns a persistent, read-only DuckDB connection to the Chinook dataset.
     Ensures that temp tables remain visible across modules and callbacks.
+    Session state (temp tables, settings) must be changed through this
+    parent connection; pooled cursors from `borrow_cursor` cannot see it.
 
     Resolves the path to `chinook.duckdb` located in the `/data/` directory
     at the project root. Raises a `FileNotFoundError` if the database file is
@@ -32,21 +61,74 @@ def get_connection() -> DuckDBPyConnection:
 
     global _conn
 
+    # Warm path: a single global check. Deliberately not thread-local, since
+    # `filtered_invoices` is a TEMP table scoped to this one connection.
     if _conn is not None:
-        log_msg("[DB] Reusing existing DuckDB connection.")
         return _conn
 
-    base_dir = os.path.dirname(os.path.dirname(__file__))
-    db_path = os.path.join(base_dir, "data", "chinook.duckdb")
-    
-    log_msg(f"[DB] Initializing DuckDB connection from: {db_path}")
+    with _conn_lock:
+        # Another thread may have connected while we waited on the lock
+        if _conn is not None:
+            return _conn
+
+        db_path = _DB_PATH
 
-    if not os.path.exists(db_path):
-        log_msg(f"  [DB] DuckDB file missing at {db_path}", level="error")
-        raise FileNotFoundError(f"DuckDB file not found at {db_path}")
+        log_msg(f"[DB] Initializing DuckDB connection from: {db_path}")
 
-    _conn = duckdb.connect(db_path, read_only=True)
-    log_msg("     [DB] Connection opened in read-only mode")
-    log_msg(f"     [DB] Connection object ID: {id(_conn)}", level="debug")
+        if not os.path.exists(db_path):
+            log_msg(f"  [DB] DuckDB file missing at {db_path}", level="error")
+            raise FileNotFoundError(f"DuckDB file not found at {db_path}")
+
+        conn = duckdb.connect(db_path, read_only=True)
+        for name, value in _SESSION_SETTINGS.items():
+            conn.execute(f"SET {name} = {value}")
+        _conn = conn
+        log_msg("     [DB] Connection opened in read-only mode")
+        log_msg(f"     [DB] Connection object ID: {id(_conn)}", level="debug")
 
     return _conn
+
+
+def _get_cursor_pool() -> "queue.Queue[DuckDBPyConnection]":
+    """
+    Lazily builds the bounded pool of cursors duplicated from the shared
+    connection.
+
+    Returns:
+        queue.Queue: Pool holding `_CURSOR_POOL_SIZE` cursors.
+    """
+    global _cursor_pool
+
+    if _cursor_pool is not None:
+        return _cursor_pool
+
+    parent = get_connection()
+    with _conn_lock:
+        if _cursor_pool is None:
+            pool = queue.Queue(maxsize=_CURSOR_POOL_SIZE)
+            for _ in range(_CURSOR_POOL_SIZE):
+                pool.put(parent.cursor())
+            _cursor_pool = pool
+            log_msg(f"[DB] Cursor pool ready ({_CURSOR_POOL_SIZE} cursors)")
+
+    return _cursor_pool
+
+
+@contextmanager
+def borrow_cursor() -> Iterator[DuckDBPyConnection]:
+    """
+    Borrows a duplicated DuckDB cursor from the pool for the `with` block.
+
+    Cursors share the database instance but not TEMP tables, so use this
+    only for queries against base tables. Anything reading
+    `filtered_invoices` or the catalog tables must use `get_connection()`.
+
+    Yields:
+        DuckDBPyConnection: A cursor, returned to the pool on exit.
+    """
+    pool = _get_cursor_pool()
+    cur = pool.get()
+    try:
+        yield cur
+    finally:
+        pool.put(cur)
@@ -4,21 +4,28 @@ Display utilities for formatting values and rendering KPI card displays.
 Includes:
 - format_kpi_value(): Converts numbers, currencies, percentages, and country 
     codes to human-readable strings
+- format_kpi_series(): Same formatting applied to a whole pandas Series
+- format_kpi_array(): Same formatting applied to a batch of plain numbers
 - flagify_country(): Translates ISO country codes into emoji flags + labels
+- flagify_country_many(): Batch version of flagify_country() for a column
 - standardize_country_to_iso3(): Cleans arbitrary country names to ISO-3 format
 - safe_kpi_entry(): Returns a kpi entry dict, with a fallback for empty values.
 - _build_kpi_list(): Internal helper. Converts a list of KPI dicts into an HTML 
-    <ul> with styled <li> items.
+    <ul> with styled <li> items (one _kpi_line() per entry).
 - safe_kpi_card(): Renders a KPI card with a header and body.
 - make_topn_kpi_card(): Makes a "Top N" ranking KPI card.
 - make_static_kpi_card(): Makes a static "set list of values" KPI card.
 """
 
-import locale
 import numbers
 import math
+import string
+import threading
 import country_converter
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+from functools import lru_cache
 from typing import Tuple, Union, List, Dict, Any, Callable, Optional
 
 from dash import html
@@ -30,11 +37,67 @@ from services.logging_utils import log_msg
 
 coco = country_converter.CountryConverter()
 
-# Set system locale for number formatting (fallback to default)
-try:
-    locale.setlocale(locale.LC_ALL, "en_US")
-except Exception:
-    locale.setlocale(locale.LC_ALL, "C")
+# Sentinel for "attribute/key not present" (distinct from a None value)
+_MISSING = object()
+
+# Component constructors bound once for the card-rendering hot path
+_Card, _CardSection, _Text, _Group, _Tooltip = (
+    dmc.Card, dmc.CardSection, dmc.Text, dmc.Group, dmc.Tooltip
+)
+_Ul, _Ol, _Li, _Span, _Strong, _Div = (
+    html.Ul, html.Ol, html.Li, html.Span, html.Strong, html.Div
+)
+
+
+# Guards bounded dict caches in this module (shared by Dash worker threads)
+_CACHE_LOCK = threading.Lock()
+
+
+def _bounded_cache_put(
+    cache: Dict[Any, Any], key: Any, value: Any, max_size: int
+) -> None:
+    """
+    Store `value` in an insertion-ordered dict cache, evicting the oldest
+    entry once `max_size` is reached.
+    """
+    with _CACHE_LOCK:
+        if key not in cache and len(cache) >= max_size:
+            cache.pop(next(iter(cache), None), None)
+        cache[key] = value
+
+
+@lru_cache(maxsize=2048)
+def _cc_convert(name: str, to: str) -> str:
+    """
+    Cached `coco.convert` for a single name (each uncached call scans
+    coco's regex table, and callers repeat the same few countries).
+    """
+    return coco.convert(names=name, to=to)
+
+
+# Regional-indicator emoji flag for every possible ISO-2 code (26 x 26)
+_FLAG_TABLE = {
+    a + b: chr(127397 + ord(a)) + chr(127397 + ord(b))
+    for a in string.ascii_uppercase for b in string.ascii_uppercase
+}
+
+
+def _build_country_table() -> Dict[str, Tuple[str, str, str]]:
+    """
+    ISO-2 -> (flag, short name, ISO-3), read straight from coco's country
+    table so labelled flags need no regex matching. Codes that coco stores
+    as patterns (e.g. Greece's GR/EL) are left out and resolved via coco.
+    """
+    return {
+        iso2: (_FLAG_TABLE[iso2], name, iso3)
+        for iso2, name, iso3 in zip(
+            coco.data["ISO2"], coco.data["name_short"], coco.data["ISO3"]
+        )
+        if isinstance(iso2, str) and iso2 in _FLAG_TABLE
+    }
+
+
+_COUNTRY_TABLE = _build_country_table()
 
 
 def format_kpi_value(
@@ -64,52 +127,238 @@ def format_kpi_value(
     Returns:
         str: Formatted string for display
     """
-    if value_type not in {"dollar", "percent", "number", "float", "country"}:
+    if value_type not in _VALUE_TYPES:
         raise ValueError(f"Unsupported value_type: {value_type}")
 
-    # Handle missing or invalid numerics
+    # Handle missing or invalid numerics (concrete int/float checked first;
+    # `v != v` is the NaN test and is safe for any Number)
     if value_type != "country":
-        if value is None or not (
-            isinstance(value, numbers.Number) or math.isnan(value)
-            ):
-            return "NA"
+        tv = type(value)
+        if not (tv is int or (tv is float and value == value)):
+            if not isinstance(value, numbers.Number) or value != value:
+                return "NA"
     else:
         if value is None:
             return "NA"
 
-    # Determine decimal places from accuracy
     try:
-        decimal_places = max(0, -int(round(locale.log10(accuracy))))
-    except Exception:
-        decimal_places = 2  # fallback
+        return _format_cached(
+            value, value_type, accuracy, prefix, label, label_type
+            )
+    except TypeError:
+        # Unhashable input: format without the result cache
+        return _make_formatter(
+            value_type, accuracy, prefix, label, label_type
+            )(value)
+
+
+@lru_cache(maxsize=8192, typed=True)
+def _format_cached(
+    value: Any,
+    value_type: str,
+    accuracy: float,
+    prefix: str,
+    label: bool,
+    label_type: str
+) -> str:
+    """
+    Memoized formatted string for one (value, spec) pair; KPI columns repeat
+    the same counts and amounts often. `typed` keeps 1 and 1.0 apart.
+    """
+    return _make_formatter(value_type, accuracy, prefix, label, label_type)(value)
+
+
+def format_kpi_series(
+    s: pd.Series,
+    value_type: str = "number",
+    accuracy: float = 0.01,
+    prefix: str = "$",
+    label: bool = True,
+    label_type: str = "name"
+) -> pd.Series:
+    """
+    Format every value of a Series as `format_kpi_value` would.
+
+    The formatter is resolved once for the whole column instead of once per
+    cell, and values are walked as plain Python scalars.
+
+    Parameters:
+        s: Series of numeric or country values
+        value_type: Display type ('number', 'dollar', etc)
+        accuracy: Rounding precision (e.g. 0.01 → round to hundredths)
+        prefix: Currency symbol if value_type == 'dollar'
+        label: Country label toggle for value_type == 'country'
+        label_type: 'name' or 'iso3' for country label
+
+    Returns:
+        pd.Series: Formatted strings, aligned to `s.index`
+    """
+    formatter = _make_formatter(value_type, accuracy, prefix, label, label_type)
+    if value_type == "country":
+        out = flagify_country_many(
+            [None if v is None else str(v) for v in s.tolist()],
+            label=label, label_type=label_type
+        )
+    elif is_numeric_dtype(s) and not is_bool_dtype(s):
+        out = format_kpi_array(
+            s.to_numpy(dtype="float64"), value_type, accuracy, prefix
+        )
+    else:
+        out = [
+            formatter(v)
+            if type(v) is int or (type(v) is float and v == v) else
+            format_kpi_value(v, value_type, accuracy, prefix, label, label_type)
+            for v in s.tolist()
+        ]
+    return pd.Series(out, index=s.index, dtype=object)
+
+
+def format_kpi_array(
+    values: Union[List[Any], np.ndarray],
+    value_type: str = "number",
+    accuracy: float = 0.01,
+    prefix: str = "$"
+) -> List[str]:
+    """
+    Format a batch of numeric values as `format_kpi_value` would.
+
+    None and NaN entries come back as "NA". Country formatting is not
+    numeric, so use `format_kpi_series` for that instead.
+
+    Parameters:
+        values: List or array of numbers (None allowed)
+        value_type: One of 'number', 'dollar', 'percent', 'float'
+        accuracy: Rounding precision (e.g. 0.01 → round to hundredths)
+        prefix: Currency symbol if value_type == 'dollar'
+
+    Returns:
+        List[str]: Formatted strings, in input order
+    """
+    if value_type not in _VALUE_TYPES or value_type == "country":
+        raise ValueError(f"Unsupported value_type for arrays: {value_type}")
+    vals = np.asarray(
+        [np.nan if v is None else v for v in values]
+        if isinstance(values, list) else values,
+        dtype="float64"
+    )
+    return _format_numeric_array(
+        vals, value_type, _decimal_places(accuracy), prefix
+    )
+
+
+def _format_numeric_array(
+    vals: np.ndarray,
+    value_type: str,
+    decimal_places: int,
+    prefix: str
+) -> List[str]:
+    """
+    Format a float64 array in one pass per type (NaN -> "NA").
+
+    Format specs round correctly on their own, so the explicit round() of
+    the scalar path is not needed for identical output.
+    """
+    na = np.isnan(vals).tolist()
+    spec = f",.{decimal_places}f"
 
     if value_type == "percent":
-        return f"{round(value * 100, decimal_places):.{decimal_places}f}%"
+        pct = f".{decimal_places}f"
+        return [
+            "NA" if m else f"{format(v, pct)}%"
+            for v, m in zip((vals * 100).tolist(), na)
+        ]
 
     if value_type == "dollar":
+        return [
+            "NA" if m else f"{prefix}{format(v, spec)}"
+            for v, m in zip(vals.tolist(), na)
+        ]
+
+    if value_type == "number":
+        # Whole values print as grouped integers, others with decimals
+        whole = (np.mod(vals, 1) == 0).tolist()
+        return [
+            "NA" if m else format(int(v), ",d") if w else format(v, spec)
+            for v, m, w in zip(vals.tolist(), na, whole)
+        ]
+
+    # float
+    return ["NA" if m else format(v, spec) for v, m in zip(vals.tolist(), na)]
+
+
+_VALUE_TYPES = frozenset({"dollar", "percent", "number", "float", "country"})
+
+# Decimal places for the accuracies callers actually use
+_ACCURACY_DP = {1: 0, 0.1: 1, 0.01: 2, 0.001: 3, 0.0001: 4, 0.00001: 5}
+
+
+def _decimal_places(accuracy: float) -> int:
+    """
+    Decimal places implied by a rounding accuracy (0.01 -> 2), looked up for
+    common values; falls back to 2 if the accuracy is unusable.
+    """
+    decimal_places = _ACCURACY_DP.get(accuracy)
+    if decimal_places is None:
+        try:
+            decimal_places = max(0, -int(round(math.log10(accuracy))))
+        except Exception:
+            decimal_places = 2  # fallback
+    return decimal_places
+
+
+@lru_cache(maxsize=64)
+def _make_formatter(
+    value_type: str,
+    accuracy: float,
+    prefix: str,
+    label: bool,
+    label_type: str
+) -> Callable[[Any], str]:
+    """
+    Build (once per spec) the formatting function used by format_kpi_value.
+
+    Validation, decimal places and the format string are resolved here, so
+    repeat calls with the same spec go straight to a specialized closure.
+    """
+    if value_type not in _VALUE_TYPES:
+        raise ValueError(f"Unsupported value_type: {value_type}")
+
+    decimal_places = _decimal_places(accuracy)
+
+    # Built-in format spec: US-style "," grouping done in C (no locale)
+    fmt = f",.{decimal_places}f"
+
+    def _fmt_percent(value):
+        return f"{round(value * 100, decimal_places):.{decimal_places}f}%"
+
+    def _fmt_dollar(value):
         rounded = round(value, decimal_places)
-        return f"{prefix}{locale.format_string(f'%.{decimal_places}f', rounded, grouping=True)}"
+        return f"{prefix}{format(rounded, fmt)}"
 
-    if value_type == "float":
+    def _fmt_float(value):
         rounded = round(value, decimal_places)
-        return locale.format_string(f'%.{decimal_places}f', rounded, grouping=True)
+        return format(rounded, fmt)
 
-    if value_type == "number":
+    def _fmt_number(value):
         # coerce to Python float for is_integer() check
         float_val = float(value)
         if float_val.is_integer():
             # integer formatting
-            return locale.format_string("%d", int(float_val), grouping=True)
-        else:
-            # fractional: use decimal_places
-            rounded = round(float_val, decimal_places)
-            fmt = f"%.{decimal_places}f"
-            return locale.format_string(fmt, rounded, grouping=True)
+            return format(int(float_val), ",d")
+        # fractional: use decimal_places
+        rounded = round(float_val, decimal_places)
+        return format(rounded, fmt)
 
-    if value_type == "country":
+    def _fmt_country(value):
         return flagify_country(str(value), label=label, label_type=label_type)
 
-    return str(value)
+    return {
+        "percent": _fmt_percent,
+        "dollar": _fmt_dollar,
+        "float": _fmt_float,
+        "number": _fmt_number,
+        "country": _fmt_country,
+    }[value_type]
 
 
 def standardize_country_to_iso3(input_str: str) -> Union[str, None]:
@@ -125,7 +374,7 @@ def standardize_country_to_iso3(input_str: str) -> Union[str, None]:
     if not isinstance(input_str, str):
         return None
 
-    iso3 = coco.convert(names=input_str, to="ISO3")
+    iso3 = _cc_convert(input_str, "ISO3")
     return iso3 if iso3 != "not found" else None
 
 
@@ -150,19 +399,62 @@ def flagify_country(
     if not isinstance(input_str, str):
         return "NA"
 
-    iso2 = coco.convert(names=input_str, to="ISO2")
-    if iso2 == "not found" or len(iso2) != 2:
-        return "NA"
+    return _flag_from_iso2(
+        _cc_convert(input_str, "ISO2"), label=label, label_type=label_type
+        )
 
-    flag = ''.join([chr(127397 + ord(c)) for c in iso2.upper()])
 
-    if not label:
-        return flag
+def flagify_country_many(
+        names: List[Any],
+        label: bool = False,
+        label_type: str = "name"
+        ) -> List[str]:
+    """
+    Vectorized `flagify_country` for a list of countries.
 
-    label_text = coco.convert(
-        names=iso2, 
-        to="name_short" if label_type == "name" else "ISO3"
-        )
+    Each distinct name is resolved once through the same cached ISO-2
+    lookup as `flagify_country`, so a column of countries costs one lookup
+    per country rather than one per row.
+
+    Parameters:
+        names (List): Country names or codes (non-strings map to "NA")
+        label (bool): Whether to include country name
+        label_type (str): "name" or "iso3"
+
+    Returns:
+        List[str]: Flag emoji + optional label, aligned to `names`
+    """
+    by_name = {
+        n: _flag_from_iso2(
+            _cc_convert(n, "ISO2"), label=label, label_type=label_type
+            )
+        for n in dict.fromkeys(names) if isinstance(n, str)
+    }
+    return [by_name.get(n, "NA") if isinstance(n, str) else "NA" for n in names]
+
+
+def _flag_from_iso2(iso2: Any, label: bool, label_type: str) -> str:
+    """
+    Flag emoji (+ optional label) for a coco ISO-2 result; "NA" if unresolved.
+    """
+    if not isinstance(iso2, str):
+        return "NA"
+
+    entry = _COUNTRY_TABLE.get(iso2)
+    if entry is not None:
+        flag, name, iso3 = entry
+        if not label:
+            return flag
+        label_text = name if label_type == "name" else iso3
+    else:
+        flag = _FLAG_TABLE.get(iso2.upper())
+        if flag is None:
+            return "NA"
+        if not label:
+            return flag
+        label_text = _cc_convert(
+            iso2, "name_short" if label_type == "name" else "ISO3"
+            )
     return f"{flag} {label_text}" if (
         label_text and label_text != "not found"
         ) else flag
@@ -178,7 +470,7 @@ def safe_kpi_entry(
     Falls back to "No data available" for None, empty string, or NaN.
     """
     if value is None or value == "" or (
-       isinstance(value, float) and pd.isna(value)
+       isinstance(value, float) and value != value
     ):
         display = "No data available"
     else:
@@ -187,6 +479,25 @@ def safe_kpi_entry(
     return {"label": label, "value": display, "tooltip": tooltip}
 
 
+def _kpi_line(entry: Union[Dict[str, Any], Any]) -> Any:
+    """
+    Render one KPI entry as "<strong>label:</strong> value" (with an optional
+    tooltip); anything that isn't a KPI dict is passed through unchanged.
+    """
+    if not (isinstance(entry, dict) and "label" in entry and "value" in entry):
+        # Treat as a pre-rendered component
+        return entry
+
+    line = _Span([
+        _Strong(f"{entry['label']}: "),
+        entry["value"]  # preserve component structure
+    ])
+    tooltip = entry.get("tooltip")
+    if tooltip:
+        line = _Tooltip(line, label=tooltip, withArrow=True, position="top")
+    return line
+
+
 def _build_kpi_list(kpis: List[Union[Dict[str, Any], Any]]) -> html.Ul:
     """
     Convert a mixed list of KPI entries into a styled <ul>.
@@ -195,28 +506,11 @@ def _build_kpi_list(kpis: List[Union[Dict[str, Any], Any]]) -> html.Ul:
     - Dicts with 'label' and 'value' keys (standard KPI entries)
     - Raw Dash components (e.g. html.Label, html.Ol), which are rendered directly
     """
-    items = []
-
-    for entry in kpis:
-        if isinstance(entry, dict) and "label" in entry and "value" in entry:
-            line = html.Span([
-                html.Strong(f"{entry['label']}: "),
-                entry["value"]  # preserve component structure
-            ])
-            if entry.get("tooltip"):
-                line = dmc.Tooltip(
-                    line,
-                    label=entry["tooltip"],
-                    withArrow=True,
-                    position="top"
-                )
-        else:
-            # Treat as a pre-rendered component
-            line = entry
+    items = [
+        _Li(_kpi_line(entry), className="kpi-list-item") for entry in kpis
+    ]
 
-        items.append(html.Li(line, className="kpi-list-item"))
-
-    return html.Ul(items, className="kpi-list")
+    return _Ul(items, className="kpi-list")
 
 
 def safe_kpi_card(
@@ -244,32 +538,32 @@ def safe_kpi_card(
         try:
             header_elems = [
                 DashIconify(icon=icon, inline=True, width=20, height=20),
-                dmc.Text(title, fw=700, size="md", span=True),
+                _Text(title, fw=700, size="md", span=True),
             ]
         except Exception:
-            header_elems = [dmc.Text(title, fw=700, size="md")]
+            header_elems = [_Text(title, fw=700, size="md")]
     else:
-        header_elems = [dmc.Text(title, fw=700, size="md")]
+        header_elems = [_Text(title, fw=700, size="md")]
 
-    header_group = dmc.Group(header_elems, gap="xs", ta="center", wrap=True)
+    header_group = _Group(header_elems, gap="xs", ta="center", wrap=True)
     if tooltip:
-        header_group = dmc.Tooltip(
+        header_group = _Tooltip(
             header_group, label=tooltip, withArrow=True, position="top"
         )
 
-    header = dmc.CardSection(
-        html.Div(header_group, className="kpi-card-header"),
+    header = _CardSection(
+        _Div(header_group, className="kpi-card-header"),
         style={"padding": 0},
         className="kpi-card-header-wrapper"
     )
 
     # If there's no bundle at all, skip to single-line body
     if not kpi_bundle:
-        body_only = dmc.CardSection(
-            dmc.Text("No data available.", ta="center"),
+        body_only = _CardSection(
+            _Text("No data available.", ta="center"),
             className="kpi-card-body"
         )
-        return dmc.Card(
+        return _Card(
             children=[header, body_only],
             className="kpi-card",
             shadow="sm", radius="md", withBorder=True,
@@ -294,8 +588,8 @@ def safe_kpi_card(
 
         # Any Dash component or HTML element:
         #     check its .children property instead of .props
-        if hasattr(res, "children"):
-            kids = res.children
+        kids = getattr(res, "children", _MISSING)
+        if kids is not _MISSING:
             # None, empty list/tuple -> truly empty
             if kids is None:
                 return True
@@ -305,37 +599,41 @@ def safe_kpi_card(
             return False
 
         # “dict with body/footer” convention
-        if isinstance(res, dict) and "body" in res:
-            return _empty(res["body"]) and not bool(res.get("footer"))
+        body = res.get("body", _MISSING) if isinstance(res, dict) else _MISSING
+        if body is not _MISSING:
+            return _empty(body) and not bool(res.get("footer"))
 
         # By default assume it isn’t empty
         return False
 
+    # Classify the result once; reused by the body and footer logic below
+    is_empty = _empty(result)
+    body = result.get("body", _MISSING) if isinstance(result, dict) else _MISSING
+
     # If body_fn gave nothing, again fall back to single-line body
-    if _empty(result):
-        body_comp = dmc.Text("No data available.", ta="center")
+    if is_empty:
+        body_comp = _Text("No data available.", ta="center")
         footer_txt = None
 
     else:
         # Non-empty: normalize into a component + optional footer
         # dict-with-body/footer protocol
-        if isinstance(result, dict) and "body" in result:
-            body_comp = result["body"]
+        if body is not _MISSING:
+            body_comp = body
             footer_txt = result.get("footer")
 
         #any Dash/HTML component -> render it directly
-        elif hasattr(result, "children"):
+        elif getattr(result, "children", _MISSING) is not _MISSING:
             body_comp = result
             footer_txt = None
 
         # a plain Python list of KPI-dicts -> build a <ul> via helper
         elif isinstance(result, list):
-            from services.display_utils import _build_kpi_list
             body_comp = _build_kpi_list(result)
             footer_txt = None
             if list_style:
                 # optional inline override
-                body_comp = html.Ul(
+                body_comp = _Ul(
                     children=body_comp.children,
                     className=body_comp.className,
                     style=list_style
@@ -343,24 +641,24 @@ def safe_kpi_card(
 
         # (shouldn’t happen) fallback
         else:
-            body_comp = dmc.Text("No data available.", ta="center")
+            body_comp = _Text("No data available.", ta="center")
             footer_txt = None
 
 
     # Wrap the body component in its section
-    body_section = dmc.CardSection(body_comp, className="kpi-card-body")
+    body_section = _CardSection(body_comp, className="kpi-card-body")
 
     # Assemble the final card
     children = [header, body_section]
-    if not _empty(result) and isinstance(result, dict) and result.get("footer"):
+    if footer_txt:
         children.append(
-            dmc.CardSection(
-                dmc.Text(result["footer"], size="md", ta="left"),
+            _CardSection(
+                _Text(footer_txt, size="md", ta="left"),
                 className="kpi-card-footer"
             )
         )
 
-    return dmc.Card(
+    return _Card(
         children=children,
         className="kpi-card",
         shadow="sm", radius="md", withBorder=True,
@@ -368,6 +666,21 @@ def safe_kpi_card(
     )
 
 
+# Rendered static KPI cards by (layout, values); oldest entry evicted first
+_STATIC_CARD_CACHE: Dict[Tuple[Any, ...], dmc.Card] = {}
+_STATIC_CARD_CACHE_MAX = 256
+
+
+def _drill_kpi(bundle: Dict[str, Any], key_path: List[str]) -> Any:
+    """
+    Follow `key_path` into a nested KPI bundle (None where a level is missing).
+    """
+    val = bundle
+    for k in key_path:
+        val = (val or {}).get(k)
+    return val
+
+
 def make_static_kpi_card(
     kpi_bundle: Dict[str, Any],
     specs: List[Dict[str, Any]],
@@ -385,12 +698,39 @@ def make_static_kpi_card(
         "tooltip":  Optional[str]
     }
     """
+    list_style = {"listStyleType": "none", "paddingLeft": 0}
+
+    # Empty bundle renders the "No data" card without touching body_fn
+    if not kpi_bundle:
+        return safe_kpi_card(
+            kpi_bundle=kpi_bundle, body_fn=list, title=title,
+            icon=icon, tooltip=tooltip, list_style=list_style
+        )
+
+    # Cards depend only on the spec layout and the values they point at
+    try:
+        key = (
+            title, icon, tooltip,
+            tuple(
+                (s["label"], tuple(s["key_path"]),
+                 bool(s.get("fmt", False)), s.get("tooltip"))
+                for s in specs
+            ),
+            tuple(_drill_kpi(kpi_bundle, s["key_path"]) for s in specs),
+        )
+        hash(key)
+    except Exception:
+        key = None  # unhashable or malformed values: build uncached
+
+    if key is not None:
+        card = _STATIC_CARD_CACHE.get(key)
+        if card is not None:
+            return card
+
     def body_fn() -> List[Dict[str, Any]]:
         entries = []
         for s in specs:
-            val = kpi_bundle
-            for k in s["key_path"]:
-                val = (val or {}).get(k)
+            val = _drill_kpi(kpi_bundle, s["key_path"])
             display = val if s.get("fmt", False) else format_kpi_value(val)
             entries.append(
                 safe_kpi_entry(
@@ -401,15 +741,20 @@ def make_static_kpi_card(
             )
         return entries
 
-    return safe_kpi_card(
+    card = safe_kpi_card(
         kpi_bundle=kpi_bundle,
         body_fn=body_fn,
         title=title,
         icon=icon,
         tooltip=tooltip,
-        list_style={"listStyleType": "none", "paddingLeft": 0}
+        list_style=list_style
     )
 
+    if key is not None:
+        _bounded_cache_put(_STATIC_CARD_CACHE, key, card, _STATIC_CARD_CACHE_MAX)
+
+    return card
+
 
 def make_topn_kpi_card(
     kpis: Dict[str, Any],
@@ -434,6 +779,13 @@ def make_topn_kpi_card(
     for p in list_path:
         src = src.get(p, {})
 
+    # Empty slice renders the "No data" card without building body_fn
+    if not src:
+        return safe_kpi_card(
+            kpi_bundle=src, body_fn=list, title=title,
+            icon=icon, tooltip=tooltip
+        )
+
     def body_fn():
         # only build the top-N list items
         items = src.get(metric_key, [])[:top_n]
@@ -450,13 +802,13 @@ def make_topn_kpi_card(
                 else itm.get(fmt_key, "--")
             )
             li_children.append(
-                html.Li([
-                    html.Strong(f"{label} "),
-                    html.Span(f"({str(val)})")
+                _Li([
+                    _Strong(f"{label} "),
+                    _Span(f"({str(val)})")
                 ])
             )
 
-        ol = html.Ol(
+        ol = _Ol(
             children=li_children,
             style={"paddingLeft": "1.2em", "margin": 0}
         )
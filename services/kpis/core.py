@@ -16,11 +16,59 @@ Functions:
 """
 
 from typing import List, Dict, Any
-import pandas as pd
 from duckdb import DuckDBPyConnection
 
 from services.logging_utils import log_msg
-from services.display_utils import format_kpi_value
+from services.display_utils import format_kpi_array
+from services.sql_filters import month_window
+
+# Date bounds are bound as parameters so DuckDB can reuse the prepared plan
+_SUBSET_KPIS_SQL = """
+WITH
+  date_filtered AS (
+    SELECT *
+    FROM filtered_invoices e
+    WHERE e.dt BETWEEN ? AND ?
+  ),
+
+  metrics AS (
+    SELECT
+      COUNT(DISTINCT df.InvoiceId)                                    AS num_purchases,
+      COUNT(DISTINCT df.CustomerId)                                   AS num_customers,
+      COUNT(DISTINCT CASE
+                       WHEN DATE(cl.first_purchase)
+                            BETWEEN ? AND ?
+                       THEN df.CustomerId END)                       AS num_first_timers,
+      COALESCE(SUM(il.Quantity), 0)                                AS tracks_sold,
+      ROUND(COALESCE(SUM(il.Quantity * il.UnitPrice), 0), 2)      AS total_revenue,
+      COUNT(DISTINCT t.GenreId)                                    AS num_genres,
+      COUNT(DISTINCT ar.ArtistId)                                   AS num_artists,
+      COUNT(DISTINCT i.BillingCountry)                             AS num_countries
+    FROM date_filtered df
+    -- first-time customer join
+    LEFT JOIN customer_first_purchase cl ON df.CustomerId = cl.CustomerId
+    -- invoice lines for tracks/revenue
+    LEFT JOIN InvoiceLine il         ON df.InvoiceId  = il.InvoiceId
+    LEFT JOIN Track t                ON il.TrackId    = t.TrackId
+    -- artist from album
+    LEFT JOIN Album al               ON t.AlbumId     = al.AlbumId
+    LEFT JOIN Artist ar              ON al.ArtistId   = ar.ArtistId
+    -- billing country
+    LEFT JOIN Invoice i              ON df.InvoiceId  = i.InvoiceId
+  )
+
+SELECT
+  ? AS date_range,
+  num_purchases,
+  num_customers,
+  num_first_timers     AS num_first_time_customers,
+  tracks_sold,
+  total_revenue,
+  num_genres,
+  num_artists,
+  num_countries
+FROM metrics;
+"""
 
 def get_subset_core_kpis(
     conn: DuckDBPyConnection,
@@ -45,116 +93,60 @@ def get_subset_core_kpis(
       - country_num: Count of distinct billing countries
     """
     # Convert date strings to month-aligned bounds
-    start = pd.to_datetime(date_range[0]).to_period("M").start_time.date()
-    end   = pd.to_datetime(date_range[1]).to_period("M").end_time.date()
+    start, end = month_window(*date_range)
     num_months = (end.year - start.year) * 12 + (end.month - start.month) + 1
 
-    check_sql = f"""
-    SELECT COUNT(*) AS num_rows
-    FROM filtered_invoices
-    WHERE DATE(dt) BETWEEN DATE('{start}') AND DATE('{end}');
-    """
+    label = f"{start:%b %Y} - {end:%b %Y}"
+    df = conn.execute(_SUBSET_KPIS_SQL, [start, end, start, end, label]).df()
 
-    count_df = conn.execute(check_sql).df()
-    if count_df.iloc[0]["num_rows"] == 0:
+    row = df.iloc[0]
+
+    # Aggregates always return one row; no purchases means an empty subset
+    if int(row["num_purchases"]) == 0:
         log_msg("[SQL - KPIs] filtered_invoices is empty for that date range.")
         return {}
 
-    sql = f"""
-    WITH
-      date_filtered AS (
-        SELECT *
-        FROM filtered_invoices e
-        WHERE DATE(e.dt) BETWEEN DATE('{start}') AND DATE('{end}')
-      ),
-
-      customer_lifespan AS (
-        SELECT
-          CustomerId,
-          MIN(InvoiceDate) AS first_purchase
-        FROM Invoice
-        GROUP BY CustomerId
-      ),
-
-      metrics AS (
-        SELECT
-          COUNT(DISTINCT df.InvoiceId)                                    AS num_purchases,
-          COUNT(DISTINCT df.CustomerId)                                   AS num_customers,
-          COUNT(DISTINCT CASE
-                           WHEN DATE(cl.first_purchase)
-                                BETWEEN DATE('{start}') AND DATE('{end}')
-                           THEN df.CustomerId END)                       AS num_first_timers,
-          COALESCE(SUM(il.Quantity), 0)                                AS tracks_sold,
-          ROUND(COALESCE(SUM(il.Quantity * il.UnitPrice), 0), 2)      AS total_revenue,
-          COUNT(DISTINCT t.GenreId)                                    AS num_genres,
-          COUNT(DISTINCT ar.ArtistId)                                   AS num_artists,
-          COUNT(DISTINCT i.BillingCountry)                             AS num_countries
-        FROM date_filtered df
-        -- first-time customer join
-        LEFT JOIN customer_lifespan cl   ON df.CustomerId = cl.CustomerId
-        -- invoice lines for tracks/revenue
-        LEFT JOIN InvoiceLine il         ON df.InvoiceId  = il.InvoiceId
-        LEFT JOIN Track t                ON il.TrackId    = t.TrackId
-        -- artist from album
-        LEFT JOIN Album al               ON t.AlbumId     = al.AlbumId
-        LEFT JOIN Artist ar              ON al.ArtistId   = ar.ArtistId
-        -- billing country
-        LEFT JOIN Invoice i              ON df.InvoiceId  = i.InvoiceId
-      )
-
-    SELECT
-      '{start:%b %Y} - {end:%b %Y}' AS date_range,
-      num_purchases,
-      num_customers,
-      num_first_timers     AS num_first_time_customers,
-      tracks_sold,
-      total_revenue,
-      num_genres,
-      num_artists,
-      num_countries
-    FROM metrics;
-    """
-
-    df = conn.execute(sql).df()
-
-    row = df.iloc[0]
-
-    # Prepare formatted output
+    # Prepare formatted output, one batch per display type
     revenue = float(row["total_revenue"])
     purchases = int(row["num_purchases"])
     customers = int(row["num_customers"])
     new_customers = int(row["num_first_time_customers"])
+    tracks = int(row["tracks_sold"])
+
+    counts = format_kpi_array(
+        [purchases, customers, new_customers, tracks,
+         int(row["num_genres"]), int(row["num_artists"]), int(row["num_countries"])],
+        "number", accuracy=1
+    )
+    dollars = format_kpi_array(
+        [
+            revenue,
+            revenue / num_months if num_months > 0 else None,
+            revenue / customers if customers > 0 else None,
+            revenue / purchases,
+        ],
+        "dollar"
+    )
+    (cust_per_new,) = format_kpi_array(
+        [new_customers / customers if customers > 0 else None], "percent"
+    )
+    (tracks_per_purchase,) = format_kpi_array([tracks / purchases], "float")
 
     kpis: Dict[str, Any] = {
-        "purchases_num":           format_kpi_value(purchases, "number", accuracy=1),
-        "cust_num":                format_kpi_value(customers, "number", accuracy=1),
-        "cust_num_new":            format_kpi_value(new_customers, "number", accuracy=1),
-        "cust_per_new":            format_kpi_value(
-            new_customers / customers if customers > 0 else None, 
-            "percent"
-            ),
-        "tracks_sold_num":         format_kpi_value(int(row["tracks_sold"]), "number", accuracy=1),
-        "tracks_per_purchase":     format_kpi_value(
-            int(row["tracks_sold"]) / int(row["num_purchases"]), 
-            "float"
-            ),
+        "purchases_num":           counts[0],
+        "cust_num":                counts[1],
+        "cust_num_new":            counts[2],
+        "cust_per_new":            cust_per_new,
+        "tracks_sold_num":         counts[3],
+        "tracks_per_purchase":     tracks_per_purchase,
         "revenue_total":           revenue,
-        "revenue_total_fmt":       format_kpi_value(revenue, "dollar"),
-        "revenue_per_month":       format_kpi_value(
-            revenue / num_months if num_months > 0 else None, 
-            "dollar"
-            ),
-        "revenue_per_cust":        format_kpi_value(
-            revenue / customers if customers > 0 else None, 
-            "dollar"
-            ),
-        "revenue_per_purchase":    format_kpi_value(
-            revenue / purchases if purchases > 0 else None, 
-            "dollar"
-            ),
-        "genre_num":               format_kpi_value(int(row["num_genres"]), "number", accuracy=1),
-        "artist_num":              format_kpi_value(int(row["num_artists"]), "number", accuracy=1),
-        "country_num":             format_kpi_value(int(row["num_countries"]), "number", accuracy=1),
+        "revenue_total_fmt":       dollars[0],
+        "revenue_per_month":       dollars[1],
+        "revenue_per_cust":        dollars[2],
+        "revenue_per_purchase":    dollars[3],
+        "genre_num":               counts[4],
+        "artist_num":              counts[5],
+        "country_num":             counts[6],
     }
 
     log_msg(f"[SQL - KPIs] Generated {len(kpis)} metrics.")
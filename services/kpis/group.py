@@ -10,109 +10,220 @@ This module contains utilities to:
 
 Functions:
   get_group_kpis_full(conn, group_var, date_range) -> pd.DataFrame
+  get_group_kpis_all(conn, date_range) -> Dict[str, pd.DataFrame]
   topn_kpis_slice_topn(df, metric, n) -> pd.DataFrame
   topn_kpis_generate(df_full, metrics, n) -> Dict[str, pd.DataFrame]
-  topn_kpis_format_display(df, group_var, total_revenue, date_range) -> pd.DataFrame
+  topn_kpis_format_display(df, group_var, total_revenue, date_range, catalog_df) -> pd.DataFrame
   query_catalog_sales(conn, tbl, group_var, date_range) -> pd.DataFrame
-  enrich_catalog_kpis(conn, tbl, topn_df, group_var, date_range) -> pd.DataFrame
+  enrich_catalog_kpis(conn, tbl, topn_df, group_var, date_range, catalog_df) -> pd.DataFrame
 """
 
 from typing import List, Dict, Literal
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
 from duckdb import DuckDBPyConnection
 
 from services.logging_utils import log_msg
-from services.display_utils import format_kpi_value
-from services.sql_filters import apply_date_filter
-
-def get_group_kpis_full(
-    conn: DuckDBPyConnection,
-    group_var: Literal["Genre", "Artist", "BillingCountry"],
-    date_range: List[str] = None
-) -> pd.DataFrame:
-    """
-    Computes full-period KPIs by group (Genre, Artist, BillingCountry)
-
-    Returns one row per group value with:
-      - revenue, num_customers, num_purchases, first_time_customers, tracks_sold
-    """
-    assert group_var in ["Genre", "Artist", "BillingCountry"]
-
-    log_msg(f"[SQL - KPIs] get_group_kpis_full(): querying full KPIs by {group_var}")
-
-    # Build group-specific joins and fields
-    if group_var == "Genre":
-        group_expr = "g.Name"
-        joins = """
+from services.display_utils import format_kpi_array, format_kpi_series
+from services.sql_filters import (
+    apply_date_filter, INVOICE_DATE_WINDOW_SQL, invoice_date_window
+)
+
+# Group-specific fields and joins for get_group_kpis_full()
+_GROUP_KPIS_SPECS = {
+    "Genre": ("g.Name", """
             JOIN Track t ON il.TrackId = t.TrackId
             JOIN Genre g ON g.GenreId = t.GenreId
             LEFT JOIN genre_catalog gc ON gc.genre = g.Name
-        """
-    elif group_var == "Artist":
-        group_expr = "ar.Name"
-        joins = """
+        """),
+    "Artist": ("ar.Name", """
             JOIN Track t ON il.TrackId = t.TrackId
             JOIN Album al ON t.AlbumId = al.AlbumId
             JOIN Artist ar ON ar.ArtistId = al.ArtistId
             LEFT JOIN artist_catalog ac ON ac.artist = ar.Name
-        """
-    else:  # BillingCountry
-        group_expr = "i.BillingCountry"
-        joins = ""
-
-    # Apply invoice filter
-    if date_range and len(date_range) == 2:
-        start = pd.to_datetime(date_range[0]).to_period("M").start_time.date()
-        end   = pd.to_datetime(date_range[1]).to_period("M").end_time.date()
-        invoice_join = f"""
-            JOIN Invoice i ON i.InvoiceId = e.InvoiceId
-            AND DATE(i.InvoiceDate) BETWEEN DATE('{start}') AND DATE('{end}')
-        """
-    else:
-        invoice_join = "JOIN Invoice i ON i.InvoiceId = e.InvoiceId"
-
-    sql = f"""
-    WITH base AS (
+        """),
+    "BillingCountry": ("i.BillingCountry", ""),
+}
+
+_GROUP_KPIS_TEMPLATE = """
+    WITH invoice_groups AS (
+        -- Collapse invoice lines to one row per invoice and group value, so
+        -- purchases are a plain COUNT(*) in the outer aggregation
         SELECT
             e.CustomerId,
-            i.InvoiceDate AS invoice_date,
             i.InvoiceId,
-            il.TrackId,
-            il.Quantity,
-            il.UnitPrice,
-            {group_expr} AS group_val
+            DATE(i.InvoiceDate) AS invoice_date,
+            {group_expr} AS group_val,
+            SUM(il.Quantity) AS qty,
+            SUM(il.Quantity * il.UnitPrice) AS rev
         FROM filtered_invoices e
         {invoice_join}
         JOIN InvoiceLine il ON i.InvoiceId = il.InvoiceId
         {joins}
+        GROUP BY ALL
     ),
-    first_purchases AS (
-        SELECT CustomerId, MIN(DATE(invoice_date)) AS first_purchase
-        FROM base
-        GROUP BY CustomerId
+    base AS (
+        SELECT
+            *,
+            MIN(invoice_date) OVER (PARTITION BY CustomerId) AS first_purchase
+        FROM invoice_groups
     )
     SELECT
         b.group_val,
         COUNT(DISTINCT b.CustomerId) AS num_customers,
-        COUNT(DISTINCT b.InvoiceId) AS num_purchases,
-        SUM(b.Quantity) AS tracks_sold,
-        SUM(b.Quantity * b.UnitPrice) AS revenue,
+        COUNT(*) AS num_purchases,
+        SUM(b.qty) AS tracks_sold,
+        SUM(b.rev) AS revenue,
+        SUM(b.rev) / NULLIF(SUM(SUM(b.rev)) OVER (), 0) AS revenue_share,
         COUNT(DISTINCT CASE
-            WHEN DATE(b.invoice_date) = fp.first_purchase
-            THEN b.CustomerId END) AS first_time_customers
+            WHEN b.invoice_date = b.first_purchase
+            THEN b.CustomerId END) AS first_time_customers,
+        SUM(b.rev) / COUNT(DISTINCT b.CustomerId) AS avg_revenue_per_cust,
+        SUM(b.rev) / COUNT(*) AS avg_revenue_per_purchase,
+        SUM(b.qty) / COUNT(*) AS avg_tracks_per_purchase
     FROM base b
-    LEFT JOIN first_purchases fp ON b.CustomerId = fp.CustomerId
-    GROUP BY b.group_val
+    GROUP BY ALL
     ORDER BY b.group_val
     ;
     """
 
-    return conn.execute(sql).df()
+def _invoice_join(date_sql: str) -> str:
+    """Invoice join, optionally narrowed by an invoice_date_window() predicate."""
+    join = "JOIN Invoice i ON i.InvoiceId = e.InvoiceId"
+    return f"{join}\n        AND {date_sql}" if date_sql else join
+
+# Only the SQL structure is formatted in; templates are keyed by the date
+# predicate from invoice_date_window() ("" when undated), whose bounds are
+# bound at execute time
+_GROUP_KPIS_SQL = {
+    (group_var, date_sql): _GROUP_KPIS_TEMPLATE.format(
+        group_expr=group_expr,
+        joins=joins,
+        invoice_join=_invoice_join(date_sql),
+    )
+    for group_var, (group_expr, joins) in _GROUP_KPIS_SPECS.items()
+    for date_sql in (INVOICE_DATE_WINDOW_SQL, "")
+}
+
+# All three groupings in one pass over the fact join (see get_group_kpis_all)
+_GROUP_KPIS_ALL_TEMPLATE = """
+    WITH base AS (
+        SELECT
+            e.CustomerId,
+            DATE(i.InvoiceDate) AS invoice_date,
+            i.InvoiceId,
+            il.Quantity,
+            il.UnitPrice,
+            g.Name AS genre,
+            ar.Name AS artist,
+            i.BillingCountry AS country,
+            MIN(DATE(i.InvoiceDate)) OVER (PARTITION BY e.CustomerId) AS first_purchase
+        FROM filtered_invoices e
+        {invoice_join}
+        JOIN InvoiceLine il ON i.InvoiceId = il.InvoiceId
+        JOIN Track t ON il.TrackId = t.TrackId
+        JOIN Genre g ON g.GenreId = t.GenreId
+        JOIN Album al ON t.AlbumId = al.AlbumId
+        JOIN Artist ar ON ar.ArtistId = al.ArtistId
+    ),
+    grouped AS (
+        SELECT
+            CASE
+                WHEN GROUPING(b.genre) = 0 THEN 'Genre'
+                WHEN GROUPING(b.artist) = 0 THEN 'Artist'
+                ELSE 'BillingCountry'
+            END AS group_dim,
+            CASE
+                WHEN GROUPING(b.genre) = 0 THEN b.genre
+                WHEN GROUPING(b.artist) = 0 THEN b.artist
+                ELSE b.country
+            END AS group_val,
+            COUNT(DISTINCT b.CustomerId) AS num_customers,
+            COUNT(DISTINCT b.InvoiceId) AS num_purchases,
+            SUM(b.Quantity) AS tracks_sold,
+            SUM(b.Quantity * b.UnitPrice) AS revenue,
+            COUNT(DISTINCT CASE
+                WHEN b.invoice_date = b.first_purchase
+                THEN b.CustomerId END) AS first_time_customers
+        FROM base b
+        GROUP BY GROUPING SETS ((b.genre), (b.artist), (b.country))
+    )
+    SELECT
+        group_dim,
+        group_val,
+        num_customers,
+        num_purchases,
+        tracks_sold,
+        revenue,
+        revenue / NULLIF(SUM(revenue) OVER (PARTITION BY group_dim), 0) AS revenue_share,
+        first_time_customers,
+        revenue / num_customers AS avg_revenue_per_cust,
+        revenue / num_purchases AS avg_revenue_per_purchase,
+        tracks_sold / num_purchases AS avg_tracks_per_purchase
+    FROM grouped
+    ORDER BY group_dim, group_val
+    ;
+    """
+
+_GROUP_KPIS_ALL_SQL = {
+    date_sql: _GROUP_KPIS_ALL_TEMPLATE.format(invoice_join=_invoice_join(date_sql))
+    for date_sql in (INVOICE_DATE_WINDOW_SQL, "")
+}
+
+def get_group_kpis_full(
+    conn: DuckDBPyConnection,
+    group_var: Literal["Genre", "Artist", "BillingCountry"],
+    date_range: List[str] = None
+) -> pd.DataFrame:
+    """
+    Computes full-period KPIs by group (Genre, Artist, BillingCountry)
+
+    Returns one row per group value with:
+      - revenue, revenue_share, num_customers, num_purchases,
+        first_time_customers, tracks_sold
+      - avg_revenue_per_cust, avg_revenue_per_purchase, avg_tracks_per_purchase
+    """
+    assert group_var in ["Genre", "Artist", "BillingCountry"]
+
+    log_msg(f"[SQL - KPIs] get_group_kpis_full(): querying full KPIs by {group_var}")
+
+    # Apply invoice filter
+    date_sql, params = invoice_date_window(date_range)
+
+    return conn.execute(_GROUP_KPIS_SQL[(group_var, date_sql)], params).df()
+
+def get_group_kpis_all(
+    conn: DuckDBPyConnection,
+    date_range: List[str] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Computes get_group_kpis_full() for Genre, Artist and BillingCountry at
+    once, with a single GROUPING SETS query over the invoice/track join.
+
+    Returns:
+        Dict[str, pd.DataFrame]: One frame per group_var, same columns as
+        get_group_kpis_full()
+    """
+    log_msg("[SQL - KPIs] get_group_kpis_all(): querying full KPIs for all groups")
+
+    date_sql, params = invoice_date_window(date_range)
+
+    df = conn.execute(_GROUP_KPIS_ALL_SQL[date_sql], params).df()
+    dims = df.pop("group_dim")
+
+    return {
+        group_var: df[(dims == group_var).to_numpy()].reset_index(drop=True)
+        for group_var in ("Genre", "Artist", "BillingCountry")
+    }
 
 def topn_kpis_slice_topn(df: pd.DataFrame, metric: str, n: int = 5) -> pd.DataFrame:
     """Returns top-N rows for a selected metric, with ties broken by group name"""
+    # Partial selection first (keeping boundary ties), then a full sort of
+    # just those few rows for the group-name tie-break
     return (
         df[df[metric].notna()]
+        .nlargest(n, metric, keep="all")
         .sort_values(by=[metric, "group_val"], ascending=[False, True])
         .head(n)
         .reset_index(drop=True)
@@ -131,12 +242,37 @@ def topn_kpis_generate(
         for m in metrics
     }
 
+# Display type for the known Top-N columns; anything else is inferred by name
+_TOPN_COL_FMT = {
+    "num_customers": "number",
+    "num_purchases": "number",
+    "tracks_sold": "number",
+    "first_time_customers": "number",
+    "catalog_size": "number",
+    "unique_tracks_sold": "number",
+    "revenue": "dollar",
+    "avg_revenue_per_cust": "dollar",
+    "avg_revenue_per_purchase": "dollar",
+    "avg_tracks_per_purchase": "float",
+    "revenue_share": "percent",
+    "pct_catalog_sold": "percent",
+}
+
+def _infer_fmt_type(col: str) -> str:
+    """Picks a display type from a column name (fallback for derived columns)"""
+    if "percent" in col or "share" in col or "pct" in col:
+        return "percent"
+    if "revenue" in col:
+        return "dollar"
+    return "float"
+
 def topn_kpis_format_display(
         conn: DuckDBPyConnection, 
         df: pd.DataFrame, 
         group_var: str, 
         total_revenue: float = None,
-        date_range: List[str] = None
+        date_range: List[str] = None,
+        catalog_df: pd.DataFrame = None
         ) -> pd.DataFrame:
     """
     Adds derived KPI columns and attaches formatted display values.
@@ -146,49 +282,61 @@ def topn_kpis_format_display(
             An active DuckDB connection.
         df (pd.DataFrame): Raw top-N KPI slice with columns like revenue, tracks_sold, etc.
         group_var (str): One of 'Genre', 'Artist', 'BillingCountry'
-        total_revenue (float): Optional total revenue for share-of-revenue calculations
+        total_revenue (float): Optional total revenue for share-of-revenue calculations,
+            used only when df has no revenue_share column yet
         date_range (Optional[List[str]]): Date range as ["YYYY-MM-DD", "YYYY-MM-DD"]
+        catalog_df (Optional[pd.DataFrame]): Precomputed query_catalog_sales()
+            result, so callers formatting several metrics query it only once
 
     Returns:
         pd.DataFrame: Extended with derived KPIs and *_fmt display columns
     """
-    # Derived metrics
-    df["avg_revenue_per_cust"] = df["revenue"] / df["num_customers"]
-    df["avg_revenue_per_purchase"] = df["revenue"] / df["num_purchases"]
-    df["avg_tracks_per_purchase"] = df["tracks_sold"] / df["num_purchases"]
-
-    df["revenue_share"] = (
-        df["revenue"] / total_revenue
-        if total_revenue and total_revenue > 0
-        else df["revenue"] / df["revenue"].sum()
-    )
+    # Derived metrics: get_group_kpis_full() already returns these, so they
+    # are only computed here for frames built some other way
+    if "avg_revenue_per_cust" not in df.columns:
+        df["avg_revenue_per_cust"] = df["revenue"] / df["num_customers"]
+    if "avg_revenue_per_purchase" not in df.columns:
+        df["avg_revenue_per_purchase"] = df["revenue"] / df["num_purchases"]
+    if "avg_tracks_per_purchase" not in df.columns:
+        df["avg_tracks_per_purchase"] = df["tracks_sold"] / df["num_purchases"]
+
+    if "revenue_share" not in df.columns:
+        df["revenue_share"] = (
+            df["revenue"] / total_revenue
+            if total_revenue and total_revenue > 0
+            else df["revenue"] / df["revenue"].sum()
+        )
 
     # Enrich with catalog statistics for artist and genre
     if group_var in ["Genre", "Artist"]:
-        df = enrich_catalog_kpis(conn, df, group_var, date_range)
-
-    # Format columns row-by-row
-    for col in df.columns:
-        if col == "group_val":
-            continue  # don't format labels
-
-        # Assign formatting type based on column name
-        fmt_type = (
-            "percent" if "percent" in col or "share" in col or "pct" in col else
-            "dollar"  if "revenue" in col else
-            "number"  if col in [
-                "tracks_sold", "num_purchases", "num_customers", "catalog_size",
-                "first_time_customers", "unique_tracks_sold"
-                ] else
-            "float"
-        )
+        df = enrich_catalog_kpis(conn, df, group_var, date_range, catalog_df)
 
-        fmt_col = f"{col}_fmt"
-        df[fmt_col] = df[col].apply(lambda x: format_kpi_value(x, value_type=fmt_type))
+    # Format columns, one batch per display type
+    fmt_types = {
+        col: _TOPN_COL_FMT.get(col) or _infer_fmt_type(col)
+        for col in df.columns if col != "group_val"  # don't format labels
+    }
+    formatted = {}
+    for fmt_type in set(fmt_types.values()):
+        cols = [c for c, t in fmt_types.items() if t == fmt_type]
+        numeric = [c for c in cols if is_numeric_dtype(df[c]) and not is_bool_dtype(df[c])]
+        if numeric:
+            # Column-major flatten so each column's values stay contiguous
+            block = df[numeric].to_numpy(dtype="float64", na_value=np.nan)
+            out = format_kpi_array(block.ravel(order="F"), fmt_type)
+            n = len(df)
+            for i, col in enumerate(numeric):
+                formatted[col] = out[i * n:(i + 1) * n]
+        for col in cols:
+            if col not in formatted:
+                formatted[col] = format_kpi_series(df[col], value_type=fmt_type)
+
+    for col in fmt_types:
+        df[f"{col}_fmt"] = formatted[col]
 
     # Optional: Format country labels using flagify_country if needed
     if group_var.lower() == "billingcountry":
-        df["group_val_fmt"] = df["group_val"].apply(lambda x: format_kpi_value(x, value_type="country"))
+        df["group_val_fmt"] = format_kpi_series(df["group_val"], value_type="country")
     else:
         df["group_val_fmt"] = df["group_val"]
 
@@ -218,13 +366,27 @@ def query_catalog_sales(
             - catalog_size (int)            total tracks in catalog
             - pct_catalog_sold (float)      unique_tracks_sold / catalog_size
     """
-    # Validate inputs
+    return _query_catalog_sales_unchecked(
+        conn, _normalize_catalog_group(group_var), date_range
+    )
+
+
+def _normalize_catalog_group(group_var: str) -> str:
+    """Validates and capitalizes a catalog group_var ('Genre' or 'Artist')"""
     if not isinstance(group_var, str):
         raise ValueError("`group_var` must be a string")
     group_var = group_var.capitalize()
     if group_var not in ("Genre", "Artist"):
         raise ValueError("`group_var` must be 'Genre' or 'Artist'")
+    return group_var
 
+
+def _query_catalog_sales_unchecked(
+    conn: DuckDBPyConnection,
+    group_var: str,
+    date_range: List[str] = None
+) -> pd.DataFrame:
+    """query_catalog_sales() body for an already-normalized group_var"""
     # Date range clause
     date_clause = apply_date_filter(date_range)
 
@@ -273,7 +435,8 @@ def enrich_catalog_kpis(
     conn: DuckDBPyConnection,
     topn_df: pd.DataFrame,
     group_var: str = "Genre",
-    date_range: List[str] = None
+    date_range: List[str] = None,
+    catalog_df: pd.DataFrame = None
 ) -> pd.DataFrame:
     """
     Join catalog-level KPIs (coverage & diversity) onto a Top-N summary.
@@ -287,6 +450,8 @@ def enrich_catalog_kpis(
         group_var : str, default "Genre"
             Either 'Genre' or 'Artist'.
         date_range (Optional[List[str]]): Date range as ["YYYY-MM-DD", "YYYY-MM-DD"]
+        catalog_df (Optional[pd.DataFrame]): Precomputed query_catalog_sales()
+            result for the same group_var and date_range; queried if None
 
     Returns:
         pd.DataFrame
@@ -295,23 +460,19 @@ def enrich_catalog_kpis(
               - catalog_size (int)
               - pct_catalog_sold (float)
     """
-    # Validate group_var
-    group_var = group_var.capitalize()
-    if group_var not in ("Genre", "Artist"):
-        raise ValueError("`group_var` must be 'Genre' or 'Artist'")
+    # Validate group_var once; the catalog query trusts the normalized value
+    group_var = _normalize_catalog_group(group_var)
 
-    # Fetch full catalog‐sales KPIs
-    catalog_df = query_catalog_sales(conn, group_var, date_range = date_range)
+    # Fetch full catalog‐sales KPIs (unless the caller already has them)
+    if catalog_df is None:
+        catalog_df = _query_catalog_sales_unchecked(conn, group_var, date_range)
 
-    # Subset to only the Top‐N groups in topn_df
     if "group_val" not in topn_df.columns:
         raise KeyError(f"topn_df must contain a `group_val` column")
-    top_values = topn_df["group_val"].unique().tolist()
-    catalog_subset = catalog_df[catalog_df["group_val"].isin(top_values)]
 
-    # Left‐join onto topn_df
+    # Left‐join onto topn_df (only the Top‐N groups survive the join)
     enriched = topn_df.merge(
-        catalog_subset,
+        catalog_df,
         how="left",
         on="group_val",
         validate="one_to_one"
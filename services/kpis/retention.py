@@ -23,6 +23,161 @@ from duckdb import DuckDBPyConnection
 from services.logging_utils import log_msg
 from services.display_utils import format_kpi_value
 
+# Cohort retention by month offset; parameters are the window start/end
+# dates and the maximum month offset (NULL = the filtered data's full span).
+_COHORT_RETENTION_SQL = """
+WITH cohort_sizes AS (
+    SELECT cohort_month,
+           COUNT(*) AS cohort_size
+    FROM customer_first_purchase
+    GROUP BY cohort_month
+),
+activity AS (
+    SELECT
+        fi.CustomerId,
+        c.cohort_month,
+        DATE_TRUNC('month', i.InvoiceDate) AS activity_month,
+        DATE_DIFF('month', c.cohort_month, i.InvoiceDate) AS month_offset
+    FROM filtered_invoices fi
+    JOIN Invoice i ON fi.InvoiceId = i.InvoiceId
+    JOIN customer_first_purchase c ON fi.CustomerId = c.CustomerId
+    WHERE i.InvoiceDate >= c.cohort_month
+      AND fi.dt BETWEEN ? AND ?
+      AND DATE_DIFF('month', c.cohort_month, i.InvoiceDate) <= COALESCE(
+          CAST(? AS INTEGER),
+          -- No cap given: span of the filtered invoices, in months
+          (SELECT DATE_DIFF('month', MIN(i2.InvoiceDate), MAX(i2.InvoiceDate))
+           FROM filtered_invoices fi2
+           JOIN Invoice i2 ON fi2.InvoiceId = i2.InvoiceId)
+      )
+),
+activity_counts AS (
+    SELECT cohort_month,
+           month_offset,
+           COUNT(DISTINCT CustomerId) AS num_active_customers
+    FROM activity
+    GROUP BY cohort_month, month_offset
+)
+SELECT
+    ac.cohort_month,
+    ac.month_offset,
+    ac.num_active_customers,
+    cs.cohort_size,
+    ROUND(ac.num_active_customers * 1.0 / cs.cohort_size, 4) AS retention_pct
+FROM activity_counts ac
+JOIN cohort_sizes cs ON ac.cohort_month = cs.cohort_month
+WHERE ac.month_offset > 0
+ORDER BY ac.cohort_month, ac.month_offset
+;
+"""
+
+# Per-customer event boundaries reduced to retention KPI scalars in one
+# query; the two bound parameters are the window's start and end dates
+# (NULL for either uses the filtered data's first/last invoice date).
+#   - Lifespans are calendar-month spans, gaps are day differences
+#   - Aggregates skip NULLs, i.e. customers a metric does not apply to
+_RETENTION_KPIS_SQL = """
+WITH params AS (
+    -- NULL bounds fall back to the filtered invoices' own date range
+    SELECT
+        COALESCE(CAST(? AS DATE), MIN(DATE(i.InvoiceDate))) AS start_date,
+        COALESCE(CAST(? AS DATE), MAX(DATE(i.InvoiceDate))) AS end_date
+    FROM filtered_invoices e
+    JOIN Invoice i ON i.InvoiceId = e.InvoiceId
+),
+all_events AS (
+    SELECT
+        e.CustomerId,
+        DATE(i.InvoiceDate) AS dt,
+        DATE(i.InvoiceDate) BETWEEN p.start_date AND p.end_date AS in_window,
+        ROW_NUMBER() OVER (
+          PARTITION BY e.CustomerId
+          ORDER BY DATE(i.InvoiceDate), e.InvoiceId
+        ) AS rn,
+        -- Numbers in-window and out-of-window events separately, so the
+        -- in-window sequence needs no second pass over a filtered copy
+        ROW_NUMBER() OVER (
+          PARTITION BY e.CustomerId,
+                       DATE(i.InvoiceDate) BETWEEN p.start_date AND p.end_date
+          ORDER BY DATE(i.InvoiceDate), e.InvoiceId
+        ) AS win_rn
+    FROM filtered_invoices e
+    JOIN Invoice i ON i.InvoiceId = e.InvoiceId
+    CROSS JOIN params p
+),
+bounds AS (
+    SELECT
+        CustomerId,
+        MIN(dt) FILTER (WHERE rn = 1) AS first_date,
+        MIN(dt) FILTER (WHERE rn = 2) AS second_date,
+        MAX(dt) AS last_date,
+        COUNT(*) AS total_purchases,
+        MAX(dt) FILTER (WHERE dt < p.start_date) AS last_before_window,
+        MIN(dt) FILTER (WHERE dt > p.end_date) AS first_after_window,
+        COUNT(*) FILTER (WHERE in_window) AS num_in_window,
+        MIN(dt) FILTER (WHERE in_window) AS first_in_window,
+        MIN(dt) FILTER (WHERE in_window AND win_rn = 2) AS second_in_window,
+        MAX(dt) FILTER (WHERE in_window) AS last_in_window
+    FROM all_events, params p
+    GROUP BY CustomerId
+    HAVING COUNT(*) FILTER (WHERE in_window) > 0
+),
+customers AS (
+    SELECT
+        b.*,
+        b.last_before_window IS NULL AS no_before,
+        b.first_after_window IS NULL AS no_after,
+        YEAR(p.start_date) * 12 + MONTH(p.start_date) AS start_mo,
+        YEAR(p.end_date) * 12 + MONTH(p.end_date) AS end_mo
+    FROM bounds b
+    CROSS JOIN params p
+)
+SELECT
+    COUNT(*) AS num_cust,
+    COUNT(*) FILTER (WHERE no_before) AS num_new,
+    COUNT(*) FILTER (WHERE total_purchases > 1) AS ret_n_any,
+    COUNT(*) FILTER (WHERE NOT no_before) AS ret_n_return,
+    COUNT(*) FILTER (WHERE no_before AND (num_in_window > 1 OR no_after)) AS ret_n_conv,
+    COUNT(*) FILTER (WHERE num_in_window > 1) AS ret_n_window,
+    AVG(
+        (YEAR(last_date) * 12 + MONTH(last_date))
+        - (YEAR(first_date) * 12 + MONTH(first_date))
+    ) FILTER (WHERE total_purchases > 1) AS avg_life_mo_tot,
+    AVG(CASE
+        WHEN no_before AND no_after THEN
+            CASE WHEN num_in_window > 1 THEN
+                (YEAR(last_in_window) * 12 + MONTH(last_in_window))
+                - (YEAR(first_in_window) * 12 + MONTH(first_in_window))
+            END
+        WHEN no_before THEN end_mo - (YEAR(first_in_window) * 12 + MONTH(first_in_window))
+        WHEN no_after THEN (YEAR(last_in_window) * 12 + MONTH(last_in_window)) - start_mo
+        ELSE end_mo - start_mo
+    END) AS avg_life_mo_win,
+    MEDIAN(DATE_DIFF('day', first_date, second_date))
+        FILTER (WHERE total_purchases > 1) AS med_gap_life,
+    MEDIAN(DATE_DIFF('day', first_in_window, second_in_window)) AS med_gap_window,
+    MEDIAN(DATE_DIFF('day', last_before_window, first_in_window)) AS med_gap_winback,
+    MEDIAN(DATE_DIFF('day', last_in_window, first_after_window)) AS med_gap_ret,
+    AVG(DATE_DIFF('day', first_date, last_date) / (total_purchases - 1))
+        FILTER (WHERE total_purchases > 1) AS avg_gap_life,
+    AVG(DATE_DIFF('day', first_in_window, last_in_window) / (num_in_window - 1))
+        FILTER (WHERE num_in_window > 1) AS avg_gap_window,
+    AVG(CASE
+        WHEN no_before AND no_after THEN
+            CASE WHEN num_in_window > 1 THEN
+                DATE_DIFF('day', first_in_window, last_in_window) / (num_in_window - 1)
+            END
+        WHEN NOT no_before AND NOT no_after THEN
+            DATE_DIFF('day', last_before_window, first_after_window) / (num_in_window + 1)
+        WHEN no_before THEN
+            DATE_DIFF('day', first_in_window, first_after_window) / num_in_window
+        ELSE
+            DATE_DIFF('day', last_before_window, last_in_window) / num_in_window
+    END) AS avg_gap_bound
+FROM customers
+;
+"""
+
 def get_retention_cohort_data(
     conn: DuckDBPyConnection,
     date_range: List[str],
@@ -44,78 +199,11 @@ def get_retention_cohort_data(
     assert len(date_range) == 2 and all(isinstance(d, str) for d in date_range)
     log_msg("[SQL - COHORT] get_retention_cohort_data(): querying cohort heatmap data.")
 
-    # Step 1: If no max_offset, compute from full dataset range
-    if max_offset is None:
-        bounds_sql = """
-        SELECT MIN(i.InvoiceDate) AS min_date,        
-            MAX(i.InvoiceDate) AS max_date
-        FROM filtered_invoices fi
-        JOIN Invoice i ON fi.InvoiceId = i.InvoiceId  
-        """
-        date_bounds = conn.execute(bounds_sql).fetchdf()
-        min_date = pd.to_datetime(date_bounds["min_date"].iloc[0])
-        max_date = pd.to_datetime(date_bounds["max_date"].iloc[0])
-
-        if pd.isna(min_date) or pd.isna(max_date):
-            log_msg("[SQL - COHORT] No invoice data available for offset calculation.")
-            return pd.DataFrame(columns=[
-                "cohort_month", "month_offset", "num_active_customers",
-                "cohort_size", "retention_pct"
-            ])
-
-        max_offset = (max_date.year - min_date.year) * 12 + (max_date.month - min_date.month)
-
-    # Step 2: Format SQL
     start = pd.to_datetime(date_range[0]).date()
     end   = pd.to_datetime(date_range[1]).date()
 
-    sql = f"""
-    WITH cohort_dates AS (
-        SELECT CustomerId,
-               DATE_TRUNC('month', MIN(InvoiceDate)) AS cohort_month
-        FROM Invoice
-        GROUP BY CustomerId
-    ),
-    cohort_sizes AS (
-        SELECT cohort_month,
-               COUNT(*) AS cohort_size
-        FROM cohort_dates
-        GROUP BY cohort_month
-    ),
-    activity AS (
-        SELECT
-            fi.CustomerId,
-            c.cohort_month,
-            DATE_TRUNC('month', i.InvoiceDate) AS activity_month,
-            DATE_DIFF('month', c.cohort_month, i.InvoiceDate) AS month_offset
-        FROM filtered_invoices fi
-        JOIN Invoice i ON fi.InvoiceId = i.InvoiceId
-        JOIN cohort_dates c ON fi.CustomerId = c.CustomerId
-        WHERE DATE_DIFF('month', c.cohort_month, i.InvoiceDate) >= 0
-          AND fi.dt BETWEEN DATE('{start}') AND DATE('{end}')
-          AND DATE_DIFF('month', c.cohort_month, i.InvoiceDate) <= {max_offset}
-    ),
-    activity_counts AS (
-        SELECT cohort_month,
-               month_offset,
-               COUNT(DISTINCT CustomerId) AS num_active_customers
-        FROM activity
-        GROUP BY cohort_month, month_offset
-    )
-    SELECT
-        ac.cohort_month,
-        ac.month_offset,
-        ac.num_active_customers,
-        cs.cohort_size,
-        ROUND(ac.num_active_customers * 1.0 / cs.cohort_size, 4) AS retention_pct
-    FROM activity_counts ac
-    JOIN cohort_sizes cs ON ac.cohort_month = cs.cohort_month
-    WHERE ac.month_offset > 0
-    ORDER BY ac.cohort_month, ac.month_offset
-    ;
-    """
-
-    df = conn.execute(sql).fetchdf()
+    # A missing max_offset is derived inside the query from the data's span
+    df = conn.execute(_COHORT_RETENTION_SQL, [start, end, max_offset]).fetchdf()
     log_msg(f"[SQL - COHORT] Cohort retention query returned {len(df)} rows.")
     return df
 
@@ -134,143 +222,29 @@ def get_retention_kpis(
     """
     log_msg("[SQL - KPIs] get_retention_kpis(): querying customer retention KPIs.")
 
-    # Fallback date range if not specified
-    if not date_range:
-        bounds_sql = f"""
-        SELECT MIN(i.InvoiceDate) AS min_date,
-               MAX(i.InvoiceDate) AS max_date
-        FROM filtered_invoices e
-        JOIN Invoice i ON i.InvoiceId = e.InvoiceId
-        """
-        bounds_df = conn.execute(bounds_sql).fetchdf()
-        date_range = bounds_df.iloc[0].tolist()
+    # Without a date range the query falls back to the data's own bounds
+    if date_range:
+        start_date = pd.to_datetime(date_range[0]).date()
+        end_date   = pd.to_datetime(date_range[1]).date()
+    else:
+        start_date = end_date = None
 
-    start_date = pd.to_datetime(date_range[0]).date()
-    end_date   = pd.to_datetime(date_range[1]).date()
-
-    # Load event boundaries per customer
-    query = f"""
-    WITH all_events AS (
-        SELECT
-            e.CustomerId,
-            e.InvoiceId,
-            DATE(i.InvoiceDate) AS dt,
-            ROW_NUMBER() OVER (
-              PARTITION BY e.CustomerId
-              ORDER BY DATE(i.InvoiceDate), e.InvoiceId
-            ) AS rn,
-            COUNT(*) OVER (PARTITION BY e.CustomerId) AS total_purchases
-        FROM filtered_invoices e
-        JOIN Invoice i ON i.InvoiceId = e.InvoiceId
-    ),
-    windowed_events AS (
-        SELECT
-            CustomerId,
-            dt,
-            ROW_NUMBER() OVER (
-              PARTITION BY CustomerId
-              ORDER BY dt, InvoiceId
-            ) AS win_rn,
-            COUNT(*) OVER (PARTITION BY CustomerId) AS num_in_window
-        FROM all_events
-        WHERE dt BETWEEN DATE('{start_date}') AND DATE('{end_date}')
-    ),
-    bounds_all AS (
-        SELECT
-            CustomerId,
-            MIN(dt) FILTER (WHERE rn = 1) AS first_date,
-            MIN(dt) FILTER (WHERE rn = 2) AS second_date,
-            MAX(dt) AS last_date,
-            total_purchases,
-            MAX(dt) FILTER (WHERE dt < DATE('{start_date}')) AS last_before_window,
-            MIN(dt) FILTER (WHERE dt > DATE('{end_date}')) AS first_after_window
-        FROM all_events
-        GROUP BY CustomerId, total_purchases
-    ),
-    bounds_window AS (
-        SELECT
-            CustomerId,
-            MAX(num_in_window) AS num_in_window,
-            MAX(CASE WHEN win_rn = 1 THEN dt END) AS first_in_window,
-            MAX(CASE WHEN win_rn = 2 THEN dt END) AS second_in_window,
-            MAX(dt) AS last_in_window
-        FROM windowed_events
-        GROUP BY CustomerId
-    )
-    SELECT *
-    FROM bounds_all a
-    JOIN bounds_window w USING (CustomerId)
-    WHERE w.num_in_window > 0
-    ;
-    """
+    # Aggregate per-customer event boundaries straight to KPI scalars
+    cur = conn.execute(_RETENTION_KPIS_SQL, [start_date, end_date])
+    row = dict(zip([d[0] for d in cur.description], cur.fetchone()))
 
-    df = conn.execute(query).fetchdf()
-    if df.empty:
+    n_total = row["num_cust"]
+    if n_total == 0:
         log_msg("[SQL - KPIs] No customer data for retention KPI window")
         return {}
 
-    log_msg(f"[SQL - KPIs] Loaded {len(df)} customers with in-window data")
+    log_msg(f"[SQL - KPIs] Aggregated {n_total} customers with in-window data")
 
-    # Derived flags and metrics
-    df["cust_new"]     = (df["num_in_window"] > 0) & df["last_before_window"].isna()
-    df["repeat_any"]   = df["total_purchases"] > 1
-    df["repeat_ret"]   = ~df["cust_new"] & (df["num_in_window"] > 0)
-    df["repeat_conv"]  = df["cust_new"] & ((df["num_in_window"] > 1) | df["first_after_window"].isna())
-    df["repeat_window"]= df["num_in_window"] > 1
-
-    # Lifespan calculations (months)
-    def month_diff(start, end):
-        if pd.isna(start) or pd.isna(end):
-            return None
-        return (end.year - start.year) * 12 + (end.month - start.month)
-
-    df["lifespan_mo_total"] = df.apply(
-        lambda r: month_diff(r["first_date"], r["last_date"]) if r["total_purchases"] > 1 else None,
-        axis=1
-    )
-
-    def lifespan_window(r):
-        if pd.isna(r["last_before_window"]) and pd.isna(r["first_after_window"]):
-            return month_diff(r["first_in_window"], r["last_in_window"]) if r["num_in_window"] > 1 else None
-        if pd.isna(r["last_before_window"]):
-            return month_diff(r["first_in_window"], end_date)
-        if pd.isna(r["first_after_window"]):
-            return month_diff(start_date, r["last_in_window"])
-        return month_diff(start_date, end_date)
-
-    df["lifespan_mo_window"] = df.apply(lifespan_window, axis=1)
-
-    # Gaps and intervals (days)
-    def gap(d1, d2): return (d2 - d1).days if pd.notna(d1) and pd.notna(d2) else None
-    df["gap_life"] = df.apply(lambda r: gap(r["first_date"], r["second_date"]) if r["total_purchases"] > 1 else None, axis=1)
-    df["gap_window"] = df.apply(lambda r: gap(r["first_in_window"], r["second_in_window"]), axis=1)
-    df["gap_winback"] = df.apply(lambda r: gap(r["last_before_window"], r["first_in_window"]), axis=1)
-    df["gap_retention"] = df.apply(lambda r: gap(r["last_in_window"], r["first_after_window"]), axis=1)
-    df["avg_gap_life"] = df.apply(lambda r: gap(r["first_date"], r["last_date"]) / (r["total_purchases"] - 1)
-                                  if r["total_purchases"] > 1 else None, axis=1)
-    df["avg_gap_window"] = df.apply(lambda r: gap(r["first_in_window"], r["last_in_window"]) / (r["num_in_window"] - 1)
-                                    if r["num_in_window"] > 1 else None, axis=1)
-
-    def avg_gap_bound(r):
-        if pd.isna(r["last_before_window"]) and pd.isna(r["first_after_window"]):
-            return r["avg_gap_window"]
-        if pd.notna(r["last_before_window"]) and pd.notna(r["first_after_window"]):
-            return gap(r["last_before_window"], r["first_after_window"]) / (r["num_in_window"] + 1)
-        if pd.isna(r["last_before_window"]):
-            return gap(r["first_in_window"], r["first_after_window"]) / r["num_in_window"]
-        if pd.isna(r["first_after_window"]):
-            return gap(r["last_before_window"], r["last_in_window"]) / r["num_in_window"]
-        return r["avg_gap_window"]
-
-    df["avg_gap_bound"] = df.apply(avg_gap_bound, axis=1)
-
-    # Aggregates
-    n_total = len(df)
-    n_new   = df["cust_new"].sum()
-    n_repeat = df["repeat_any"].sum()
-    n_ret = df["repeat_ret"].sum()
-    n_conv = df["repeat_conv"].sum()
-    n_rep_w = df["repeat_window"].sum()
+    n_new    = row["num_new"]
+    n_repeat = row["ret_n_any"]
+    n_ret    = row["ret_n_return"]
+    n_conv   = row["ret_n_conv"]
+    n_rep_w  = row["ret_n_window"]
 
     raw_kpis = {
         "num_cust": n_total,
@@ -286,42 +260,12 @@ def get_retention_kpis(
         "ret_rate_conv": n_conv / n_new if n_new > 0 else None,
         "ret_n_window": n_rep_w,
         "ret_rate_window": n_rep_w / n_total if n_total > 0 else None,
-        "avg_life_mo_tot": (
-            df["lifespan_mo_total"].dropna().mean()
-            if not df["lifespan_mo_total"].dropna().empty else None
-        ),
-        "avg_life_mo_win": (
-            df["lifespan_mo_window"].dropna().mean()
-            if not df["lifespan_mo_window"].dropna().empty else None
-        ),
-        "med_gap_life": (
-            df["gap_life"].dropna().median() 
-            if not df["gap_life"].dropna().empty else None
-        ),
-        "med_gap_window": (
-            df["gap_window"].dropna().median() 
-            if not df["gap_window"].dropna().empty else None
-        ),
-        "med_gap_winback": (
-            df["gap_winback"].dropna().median() 
-            if not df["gap_winback"].dropna().empty else None
-        ),
-        "med_gap_ret": (
-            df["gap_retention"].dropna().median() 
-            if not df["gap_retention"].dropna().empty else None
-        ),
-        "avg_gap_life": (
-            df["avg_gap_life"].dropna().mean() 
-            if not df["avg_gap_life"].dropna().empty else None
-        ),
-        "avg_gap_window": (
-            df["avg_gap_window"].dropna().mean() 
-            if not df["avg_gap_window"].dropna().empty else None
-        ),
-        "avg_gap_bound": (
-            df["avg_gap_bound"].dropna().mean() 
-            if not df["avg_gap_bound"].dropna().empty else None
-        )
+        # Lifespans, gaps and intervals (NULL when no customer qualifies)
+        **{key: row[key] for key in (
+            "avg_life_mo_tot", "avg_life_mo_win",
+            "med_gap_life", "med_gap_window", "med_gap_winback", "med_gap_ret",
+            "avg_gap_life", "avg_gap_window", "avg_gap_bound",
+        )},
     }
 
     # Format KPIs
@@ -13,8 +13,7 @@ and cohort retention KPIs into a single nested payload.  It:
       metadata_kpis, topn (nested tables), and retention_kpis
 
 Functions:
-  make_serializable(obj)
-  get_shared_kpis(conn, tbl, metrics, date_range, cohort_df, top_n, offsets) → Dict[str, Any]
+  get_shared_kpis(conn, tbl, metrics, date_range, cohort_df, top_n, offsets, group_kpis) → Dict[str, Any]
 """
 
 from typing import List, Dict, Optional, Any
@@ -23,28 +22,20 @@ from duckdb import DuckDBPyConnection
 
 from services.logging_utils import log_msg
 from services.kpis.core import get_subset_core_kpis
-from services.kpis.group import get_group_kpis_full, topn_kpis_slice_topn, topn_kpis_format_display
+from services.kpis.group import (
+    get_group_kpis_all, topn_kpis_slice_topn, topn_kpis_format_display,
+    query_catalog_sales
+)
 from services.kpis.retention import get_retention_kpis
 
-def make_serializable(obj):
-    """
-    Walks over the mixed JSON output of the KPI calls and converts to serializable
-    """
-    if isinstance(obj, pd.DataFrame):
-        return obj.to_dict('records')
-    if isinstance(obj, dict):
-        return {k: make_serializable(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [make_serializable(v) for v in obj]
-    return obj
-
 def get_shared_kpis(
     conn: DuckDBPyConnection,
     metrics: List[Dict[str, str]],
     date_range: Optional[List[str]],
     cohort_df: pd.DataFrame,
     top_n: int = 5,
-    offsets: List[int] = [3, 6, 9]
+    offsets: List[int] = [3, 6, 9],
+    group_kpis: Optional[Dict[str, pd.DataFrame]] = None
 ) -> Dict[str, Any]:
     """
     Aggregate core metadata KPIs, Top-N group slices, and cohort retention KPIs.
@@ -56,6 +47,8 @@ def get_shared_kpis(
         cohort_df (pd.DataFrame): Precomputed cohort retention data
         top_n (int): Number of top groups to include
         offsets (List[int]): Month offsets for top cohort snapshots
+        group_kpis (Dict[str, pd.DataFrame], optional): Precomputed
+            get_group_kpis_all() output; queried here if omitted
 
     Returns:
         Dict[str,Any] with keys:
@@ -73,12 +66,22 @@ def get_shared_kpis(
     
     # Top-N group slices
     topn_by_group: Dict[str, Dict[str, Any]] = {}
+    full_by_group = (
+        group_kpis if group_kpis is not None
+        else get_group_kpis_all(conn, date_range)
+    )
     for group in ["Genre", "Artist", "BillingCountry"]:
         log_msg(f"   [SQL - KPI PIPELINE] Generating top-{top_n} tables for {group}")
 
-        full_df = get_group_kpis_full(conn, group, date_range)
+        full_df = full_by_group[group]
         group_tables: Dict[str, Any] = {}
 
+        # Catalog coverage is metric-independent: query it once per group
+        catalog_df = (
+            query_catalog_sales(conn, group, date_range)
+            if group in ("Genre", "Artist") else None
+        )
+
         for metric_def in metrics:
             var = metric_def["var_name"]
             topn_df = topn_kpis_slice_topn(full_df, var, top_n)
@@ -87,9 +90,11 @@ def get_shared_kpis(
                 topn_df,
                 group_var=group,
                 total_revenue=float(metadata_kpis["revenue_total"]),
-                date_range=date_range
+                date_range=date_range,
+                catalog_df=catalog_df
             )
-            group_tables[var] = formatted
+            # Stored as records up front so the bundle is JSON-ready as built
+            group_tables[var] = formatted.to_dict("records")
 
         group = "country" if group == "BillingCountry" else group
         # add total distinct values for this group
@@ -117,4 +122,4 @@ def get_shared_kpis(
         "retention_kpis": retention_kpis
     }
 
-    return make_serializable(kpi_data)
+    return kpi_data
@@ -6,6 +6,8 @@ Respects environment-level logging flags via ENABLE_LOGGING in config.
 """
 
 import logging
+from typing import Any, Tuple
+
 from config import ENABLE_LOGGING
 
 logging.basicConfig(
@@ -13,20 +15,41 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-def log_msg(msg: str, level: str = "info", cond: bool = True) -> None:
+# Logger functions resolved once, instead of a getattr() per call
+_LEVELS = {
+    "debug": logging.debug,
+    "info": logging.info,
+    "warning": logging.warning,
+    "error": logging.error,
+    "critical": logging.critical,
+    "exception": logging.exception,
+}
+
+def log_msg(
+    msg: str,
+    level: str = "info",
+    cond: bool = True,
+    args: Tuple[Any, ...] = (),
+) -> None:
     """
     Logs a message conditionally based on config and user-defined logic.
 
     Parameters:
-        msg (str): Message to log.
+        msg (str): Message to log (may contain %-style placeholders).
         level (str): Logging level (e.g. 'info', 'warning', 'error').
         cond (bool): Additional condition to trigger logging.
+        args (tuple): Values for the placeholders in `msg`. Formatting is
+            deferred to the logging module, so nothing is built when
+            logging is disabled.
 
     Returns:
         None
     """
-    try:
-        if ENABLE_LOGGING and cond:
-            getattr(logging, level)(msg)
-    except Exception as e:
-        logging.warning(f"Logging failure: {e}")
+    if not (ENABLE_LOGGING and cond):
+        return
+
+    log_fn = _LEVELS.get(level)
+    if log_fn is None:
+        logging.warning(f"Logging failure: unknown level {level!r}")
+        return
+    log_fn(msg, *args)
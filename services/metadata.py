@@ -4,6 +4,7 @@ Metadata services for the Chinook dashboard.
 Provides:
 - Sidebar filter metadata (genres, countries, artists, date range)
 - Static summary table (overview) from the dataset
+- In-process caching of both, with invalidate_metadata_cache()
 - GitHub commit timestamp (with local caching)
 - Artist and Genre catalog summary tables (temp DuckDB) creation and validation
 
@@ -11,30 +12,76 @@ Designed for high-efficiency reads from DuckDB and low-frequency API usage.
 """
 
 import os
+import copy
 import json
 import time
 import pandas as pd
-from typing import Dict, Tuple, Any
+from typing import Callable, Dict, Optional, Tuple, Any
 from duckdb import DuckDBPyConnection
 from github import Github, Auth
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-from services.db import get_connection
+from services.db import borrow_cursor
 from services.logging_utils import log_msg
 from services.display_utils import format_kpi_value
 from config import CACHE_PATH, CACHE_EXPIRY_SECONDS
 
+# In-process cache for the static metadata builders: key -> (timestamp, value).
+# The dataset is read-only per process, so entries only expire on the TTL or
+# an explicit invalidate_metadata_cache().
+_META_CACHE: Dict[str, Tuple[float, Any]] = {}
+_META_CACHE_TTL = 600  # seconds
+
+def _get_meta_cached(key: str, build: Callable[[], Any]) -> Any:
+    """
+    Returns the cached value for key, rebuilding it when missing or stale.
+    """
+    hit = _META_CACHE.get(key)
+    if hit is not None and time.monotonic() - hit[0] < _META_CACHE_TTL:
+        log_msg(f"[META] Using cached {key}.")
+        return hit[1]
+
+    value = build()
+    _META_CACHE[key] = (time.monotonic(), value)
+    return value
+
+def invalidate_metadata_cache() -> None:
+    """
+    Clears cached filter metadata and static summary, e.g. after reloading data.
+    """
+    _META_CACHE.clear()
+    log_msg("[META] Metadata cache cleared.")
+
 def format_commit_date(dt_utc: datetime) -> str:
     dt_local = dt_utc.replace(tzinfo=ZoneInfo("UTC")).astimezone(ZoneInfo("America/Chicago"))
     return dt_local.strftime("%b %d, %Y")
 
-def get_last_commit_date() -> str:
+def _read_commit_cache() -> Optional[Dict[str, Any]]:
+    """
+    Loads the local commit date cache file.
+
+    Returns:
+        Optional[Dict[str, Any]]: Cached record, or None if no file exists
+    """
+    if not os.path.exists(CACHE_PATH):
+        return None
+    with open(CACHE_PATH, "r") as f:
+        return json.load(f)
+
+
+def get_last_commit_date(
+    cache_reader: Callable[[], Optional[Dict[str, Any]]] = _read_commit_cache
+) -> str:
     """
     Retrieves the timestamp of the most recent commit on GitHub.
 
     Caches the result locally to avoid hitting GitHub's API rate limits.
 
+    Parameters:
+        cache_reader (Callable): Returns the cached record or None;
+            defaults to reading CACHE_PATH
+
     Returns:
         str: Formatted commit date (e.g. "Jul 20, 2025") or "Unavailable"
     """
@@ -42,26 +89,26 @@ def get_last_commit_date() -> str:
     log_msg("[META - GITHUB] Getting last commit date.")
 
     # Check for cached value
-    if os.path.exists(CACHE_PATH):
-        try:
-            with open(CACHE_PATH, "r") as f:
-                cache = json.load(f)
-                cached_time = cache.get("timestamp")
-                if cached_time:
-                    age = time.time() - float(cached_time)
-                    if age < CACHE_EXPIRY_SECONDS:
-                        log_msg("     [META - GITHUB] Last commit date loaded from local cache")
-                        return cache.get("last_updated", "Unavailable")
-        except Exception as e:
-            log_msg(f"     [META - GITHUB] Error reading cache: {e}")
+    try:
+        cache = cache_reader()
+        cached_time = cache.get("timestamp") if cache else None
+        if cached_time:
+            age = time.time() - float(cached_time)
+            if age < CACHE_EXPIRY_SECONDS:
+                log_msg("     [META - GITHUB] Last commit date loaded from local cache")
+                return cache.get("last_updated", "Unavailable")
+    except Exception as e:
+        log_msg(f"     [META - GITHUB] Error reading cache: {e}")
 
     # Fallback to GitHub API
     try:
         log_msg("     [META - GITHUB] Checking GitHub...")
         token = os.getenv("GITHUB_TOKEN")
-        g = Github(token) if token else Github()
-        repo = g.get_repo("corvidfox/chinook-dashboard-pydash")
-        last_commit = repo.get_commits()[0]
+        # One commit per page, and a lazy repo handle: only the commits
+        # request goes over the wire
+        g = Github(token, per_page=1) if token else Github(per_page=1)
+        repo = g.get_repo("corvidfox/chinook-dashboard-pydash", lazy=True)
+        last_commit = repo.get_commits().get_page(0)[0]
         date_str = format_commit_date(last_commit.commit.author.date)
 
         with open(CACHE_PATH, "w") as f:
@@ -79,7 +126,8 @@ def get_filter_metadata() -> Dict[str, Any]:
     Fetches metadata required for dashboard filters.
 
     Extracts genre, country, artist names, and full dataset date range
-    in ISO format. Static values for metric options.
+    in ISO format. Static values for metric options. Cached in-process
+    (see invalidate_metadata_cache); callers get their own copy.
 
     Returns:
         dict: {
@@ -90,33 +138,49 @@ def get_filter_metadata() -> Dict[str, Any]:
             'metrics': List[Dict]
         }
     """
+    return copy.deepcopy(
+        _get_meta_cached("filter_metadata", _query_filter_metadata)
+    )
+
+
+def _query_filter_metadata() -> Dict[str, Any]:
+    """
+    Queries DuckDB for get_filter_metadata(); see there for the layout.
+    """
     log_msg("[META] Fetching filter metadata from DuckDB.")
-    conn = get_connection()
 
-    queries = {
-        "genres": "SELECT DISTINCT Name FROM Genre ORDER BY Name",
-        "countries": "SELECT DISTINCT BillingCountry FROM Invoice ORDER BY BillingCountry",
-        "artists": "SELECT DISTINCT Name FROM Artist ORDER BY Name",
-        "date_range": "SELECT MIN(InvoiceDate), MAX(InvoiceDate) FROM Invoice"
-    }
+    # One round-trip; each sorted, de-duplicated list is a single aggregate
+    # and the Invoice columns share one scan
+    query = """
+        SELECT g.genres, inv.countries, ar.artists, inv.date_min, inv.date_max
+        FROM
+            (SELECT COALESCE(list_sort(list_distinct(list(Name))), []) AS genres
+             FROM Genre) g,
+            (SELECT
+                COALESCE(list_sort(list_distinct(list(BillingCountry))), [])
+                    AS countries,
+                STRFTIME(MIN(InvoiceDate), '%Y-%m-%d') AS date_min,
+                STRFTIME(MAX(InvoiceDate), '%Y-%m-%d') AS date_max
+             FROM Invoice) inv,
+            (SELECT COALESCE(list_sort(list_distinct(list(Name))), []) AS artists
+             FROM Artist) ar
+    """
 
-    genres    = [r[0] for r in conn.execute(queries["genres"]).fetchall()]
-    countries = [r[0] for r in conn.execute(queries["countries"]).fetchall()]
-    artists   = [r[0] for r in conn.execute(queries["artists"]).fetchall()]
-    date_min, date_max = conn.execute(queries["date_range"]).fetchone()
+    # Base tables only, so a pooled cursor is safe here
+    with borrow_cursor() as conn:
+        genres, countries, artists, date_min, date_max = (
+            conn.execute(query).fetchone()
+        )
 
     log_msg(f"     [META] Found {len(genres)} genres, {len(countries)} countries, {len(artists)} artists")
 
-    def to_iso(val):
-        return val.date().isoformat() if hasattr(val, "date") else str(val)[:10]
-
-    log_msg(f"     [META] Date range: {to_iso(date_min)} to {to_iso(date_max)}")
+    log_msg(f"     [META] Date range: {date_min} to {date_max}")
 
     return {
         "genres": genres,
         "countries": countries,
         "artists": artists,
-        "date_range": (to_iso(date_min), to_iso(date_max)),
+        "date_range": (date_min, date_max),
         "metrics": [
             {"label": "Revenue (USD$)", "var_name": "revenue"},
             {"label": "Number of Customers", "var_name": "num_customers"},
@@ -132,63 +196,103 @@ def get_static_summary() -> pd.DataFrame:
     Fetches and formats static dashboard-level KPIs.
 
     Unpivots SQL aggregates into labeled rows and applies formatting
-    for display in sidebar or summary views.
+    for display in sidebar or summary views. Cached in-process (see
+    invalidate_metadata_cache); callers get their own copy.
 
     Returns:
         pd.DataFrame: Columns = ['Metric', 'Value']
     """
-    conn = get_connection()
+    return _get_meta_cached("static_summary", _query_static_summary).copy()
+
+
+# Static summary rows in display order: (label, column, value type); a None
+# type marks a value already formatted in SQL
+_STATIC_SUMMARY_ROWS = [
+    ("Date Range",           "DateRange",    None),
+    ("Number of Purchases",  "NumPurchases", "number"),
+    ("Number of Customers",  "NumCustomers", "number"),
+    ("Tracks Sold",          "TracksSold",   "number"),
+    ("Total Revenue (USD$)", "TotalRevenue", "dollar"),
+    ("Number of Genres",     "NumGenres",    "number"),
+    ("Number of Artists",    "NumArtists",   "number"),
+    ("Number of Countries",  "NumCountries", "number"),
+]
+
+def _query_static_summary() -> pd.DataFrame:
+    """
+    Queries and formats the rows for get_static_summary().
+    """
+    # Every Invoice aggregate comes from one scan; the single result row is
+    # unpivoted below against _STATIC_SUMMARY_ROWS
     sql = """
-    WITH
-    invoice_summary AS (
-        SELECT
-            MIN(InvoiceDate) AS MinDate,
-            MAX(InvoiceDate) AS MaxDate,
-            ROUND(SUM(Total), 2) AS TotalRevenue,
-            COUNT(DISTINCT InvoiceId) AS NumPurchases,
-            COUNT(DISTINCT CustomerId) AS NumCustomers,
-            COUNT(DISTINCT BillingCountry) AS NumCountries
-        FROM Invoice
-    ),
-    track_summary AS (
-        SELECT COUNT(*) AS TracksSold FROM InvoiceLine
-    ),
-    genre_ct  AS (SELECT COUNT(*) AS NumGenres FROM Genre),
-    artist_ct AS (SELECT COUNT(*) AS NumArtists FROM Artist)
-    SELECT 'Date Range' AS Metric,
-           STRFTIME('%b %Y', MinDate) || ' – ' || STRFTIME('%b %Y', MaxDate) AS Value
-    FROM invoice_summary
-    UNION ALL SELECT 'Number of Purchases',  NumPurchases    FROM invoice_summary
-    UNION ALL SELECT 'Number of Customers',  NumCustomers    FROM invoice_summary
-    UNION ALL SELECT 'Tracks Sold',          TracksSold      FROM track_summary
-    UNION ALL SELECT 'Total Revenue (USD$)', TotalRevenue    FROM invoice_summary
-    UNION ALL SELECT 'Number of Genres',     NumGenres       FROM genre_ct
-    UNION ALL SELECT 'Number of Artists',    NumArtists      FROM artist_ct
-    UNION ALL SELECT 'Number of Countries',  NumCountries    FROM invoice_summary
-    """
-
-    df: pd.DataFrame = conn.execute(sql).df()
-
-    def format_row(row):
-        metric, value = row["Metric"], row["Value"]
-        if metric == "Date Range":
-            return value
-        return format_kpi_value(float(value), value_type="dollar" if "Revenue" in metric else "number")
-
-    df["Value"] = df.apply(format_row, axis=1)
+    SELECT
+        STRFTIME('%b %Y', MIN(i.InvoiceDate)) || ' – '
+            || STRFTIME('%b %Y', MAX(i.InvoiceDate)) AS DateRange,
+        ROUND(SUM(i.Total), 2) AS TotalRevenue,
+        COUNT(*) AS NumPurchases,  -- one row per invoice (Chinook PK)
+        COUNT(DISTINCT i.CustomerId) AS NumCustomers,
+        COUNT(DISTINCT i.BillingCountry) AS NumCountries,
+        (SELECT COUNT(*) FROM InvoiceLine) AS TracksSold,
+        (SELECT COUNT(*) FROM Genre) AS NumGenres,
+        (SELECT COUNT(*) FROM Artist) AS NumArtists
+    FROM Invoice i
+    """
+
+    # Base tables only, so a pooled cursor is safe here
+    with borrow_cursor() as conn:
+        cur = conn.execute(sql)
+        row = dict(zip([d[0] for d in cur.description], cur.fetchone()))
+
+    df = pd.DataFrame({
+        "Metric": [label for label, _, _ in _STATIC_SUMMARY_ROWS],
+        "Value": [
+            row[col] if value_type is None
+            else format_kpi_value(float(row[col]), value_type=value_type)
+            for _, col, value_type in _STATIC_SUMMARY_ROWS
+        ],
+    })
     log_msg(f"[META] Static summary generated with {len(df)} metrics")
 
     return df
 
 
-def create_catalog_tables(conn: DuckDBPyConnection) -> None:
+_CATALOG_TABLES = {"genre_catalog", "artist_catalog", "customer_first_purchase"}
+
+def _missing_catalog_tables(conn: DuckDBPyConnection) -> set:
+    """
+    Returns the catalog temp tables not yet present on this connection.
+    """
+    names = sorted(_CATALOG_TABLES)
+    found = {
+        row[0] for row in conn.execute(
+            "SELECT table_name FROM duckdb_tables() "
+            f"WHERE temporary AND table_name IN ({', '.join('?' * len(names))})",
+            names
+        ).fetchall()
+    }
+    return _CATALOG_TABLES - found
+
+
+def create_catalog_tables(
+    conn: DuckDBPyConnection,
+    force: bool = False
+) -> None:
     """
-    Creates temp catalog tables for genre and artist coverage metrics.
+    Creates temp catalog tables for genre and artist coverage metrics, plus
+    each customer's whole-history first purchase (shared by the KPI queries).
+
+    The dataset is static, so tables already built on this connection are
+    kept as they are unless force=True.
 
     Tables:
         - genre_catalog: [genre, num_tracks]
         - artist_catalog: [artist, num_tracks]
+        - customer_first_purchase: [CustomerId, first_purchase, cohort_month]
     """
+    if not force and not _missing_catalog_tables(conn):
+        log_msg("[DATA META - SQL] Catalog tables already built, skipping.")
+        return
+
     log_msg("[DATA META - SQL] Creating catalog tables in DuckDB.")
 
     conn.execute(
@@ -211,8 +315,20 @@ def create_catalog_tables(conn: DuckDBPyConnection) -> None:
         JOIN Artist ar ON al.ArtistId = ar.ArtistId
         GROUP BY artist
     """)
-    num_genres = conn.execute("SELECT COUNT(*) FROM genre_catalog").fetchone()[0]
-    num_artists = conn.execute("SELECT COUNT(*) FROM artist_catalog").fetchone()[0]
+
+    conn.execute(
+    """CREATE OR REPLACE TEMP TABLE customer_first_purchase AS
+        SELECT
+            CustomerId,
+            MIN(InvoiceDate) AS first_purchase,
+            DATE_TRUNC('month', MIN(InvoiceDate)) AS cohort_month
+        FROM Invoice
+        GROUP BY CustomerId
+    """)
+    num_genres, num_artists = conn.execute(
+        "SELECT (SELECT COUNT(*) FROM genre_catalog), "
+        "(SELECT COUNT(*) FROM artist_catalog)"
+    ).fetchone()
 
     log_msg(f"     [DATA META - SQL] genre_catalog populated with {num_genres} rows")
     log_msg(f"     [DATA META - SQL] artist_catalog populated with {num_artists} rows")
@@ -220,21 +336,20 @@ def create_catalog_tables(conn: DuckDBPyConnection) -> None:
 
 def check_catalog_tables(conn: DuckDBPyConnection) -> bool:
     """
-    Verifies presence of catalog temp tables: genre_catalog and artist_catalog.
+    Verifies presence of catalog temp tables: genre_catalog, artist_catalog
+    and customer_first_purchase.
 
     Parameters:
         conn (DuckDBPyConnection): DuckDB connection
 
     Returns:
-        bool: True if both tables exist, False otherwise
+        bool: True if all tables exist, False otherwise
     """
-    expected = {"genre_catalog", "artist_catalog"}
-    found = {row[0] for row in conn.execute("SHOW TABLES").fetchall()}
-    missing = expected - found
+    missing = _missing_catalog_tables(conn)
 
     if missing:
         log_msg(
-            msg=f"[DATA META - SQL] Missing catalog tables: {', '.join(missing)}",
+            msg=f"[DATA META - SQL] Missing catalog tables: {', '.join(sorted(missing))}",
             level="warning"
         )
         return False
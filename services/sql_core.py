@@ -5,11 +5,13 @@ Reusable SQL queries that support cross-page data features like event stream.
 Includes fingerprint-aware event filtering.
 """
 
-from typing import List, Optional
+from typing import Any, Optional, Sequence, Union
 from duckdb import DuckDBPyConnection
+from functools import lru_cache
 import hashlib
+import re
+import orjson
 import pandas as pd
-import json
 from services.logging_utils import log_msg
 
 
@@ -28,16 +30,56 @@ def hash_invoice_ids(df: pd.DataFrame) -> str:
     serialized = ",".join(sorted_ids)
     return hashlib.md5(serialized.encode()).hexdigest()
 
+# Same fingerprint as hash_invoice_ids(), computed in DuckDB: the distinct
+# ids are joined in string order, and an empty set hashes the empty string.
+# The same pass also returns the row count and the distinct invoice count.
+_FILTERED_IDS_HASH_SQL = """
+    SELECT
+        md5(COALESCE(string_agg(id, ',' ORDER BY id), '')),
+        COALESCE(SUM(num_rows), 0),
+        COUNT(id)
+    FROM (
+        SELECT CAST(InvoiceId AS VARCHAR) AS id, COUNT(*) AS num_rows
+        FROM filtered_invoices
+        GROUP BY InvoiceId
+    )
+"""
+
+def hash_filtered_invoice_ids(conn: DuckDBPyConnection) -> str:
+    """
+    Generates the hash_invoice_ids() signature for the filtered_invoices
+    temp table without pulling its rows into Python.
+
+    Parameters:
+        conn (DuckDBPyConnection): Connection holding filtered_invoices
+
+    Returns:
+        str: MD5 hash representing the invoice set's identity.
+    """
+    return conn.execute(_FILTERED_IDS_HASH_SQL).fetchone()[0]
+
+def _fingerprint() -> Any:
+    """
+    Hasher for cache fingerprints (not security): BLAKE2b at 128 bits keeps
+    the 32-character hex keys MD5 produced while hashing bulk bytes faster.
+    """
+    return hashlib.blake2b(digest_size=16)
+
 def hash_dataframe(df: pd.DataFrame) -> str:
     """
-    Produce an MD5 fingerprint of a dataframe.
+    Produce a fingerprint of a dataframe.
+
+    Hashes pandas' vectorized per-row hashes plus the column labels, rather
+    than a text serialization of every cell.
     """
-    payload = df.to_csv(index=False).encode("utf8")
-    return hashlib.md5(payload).hexdigest()
+    h = _fingerprint()
+    h.update(",".join(map(str, df.columns)).encode("utf8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
 
 def hash_kpi_bundle(bundle: dict) -> str:
     """
-    Produce an MD5 fingerprint of a KPI‐bundle dict, 
+    Produce a fingerprint of a KPI‐bundle dict, 
     converting any DataFrames into JSON‐serializable dicts.
     """
     def _serialize(o):
@@ -45,83 +87,117 @@ def hash_kpi_bundle(bundle: dict) -> str:
         if isinstance(o, pd.DataFrame):
             return o.to_dict(orient="split")
 
-        # Let the JSON module recurse into lists/dicts:
+        # Let orjson recurse into lists/dicts:
         raise TypeError(
             f"Object of type {o.__class__.__name__} is not JSON serializable"
             )
 
-    # json.dumps will call _serialize() whenever it hits a DataFrame
-    payload = json.dumps(
+    # orjson calls _serialize() whenever it hits a DataFrame; numpy scalars
+    # and arrays are encoded natively
+    payload = orjson.dumps(
         bundle,
         default=_serialize,
-        sort_keys=True,
-    ).encode("utf8")
+        option=(
+            orjson.OPT_SORT_KEYS
+            | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_SERIALIZE_NUMPY
+        ),
+    )
 
-    return hashlib.md5(payload).hexdigest()
+    h = _fingerprint()
+    h.update(payload)
+    return h.hexdigest()
+
+# Dimension joins for get_events_shared(), in dependency order: each is
+# added only if a filter clause references one of its trigger aliases.
+_EVENT_JOINS = [
+    (("t", "al", "ar", "g"), "JOIN Track t ON il.TrackId = t.TrackId"),
+    (("al", "ar"),           "JOIN Album al ON t.AlbumId = al.AlbumId"),
+    (("ar",),                "JOIN Artist ar ON al.ArtistId = ar.ArtistId"),
+    (("g",),                 "JOIN Genre g ON t.GenreId = g.GenreId"),
+]
+
+# Deduplicated, ordered and stored without leaving DuckDB; only the optional
+# joins and the WHERE clause vary per call
+_EVENTS_TABLE_TEMPLATE = """
+    CREATE OR REPLACE TEMP TABLE filtered_invoices AS
+    SELECT DISTINCT
+        i.CustomerId,
+        DATE(i.InvoiceDate) AS dt,
+        i.InvoiceId,
+        CAST(DATE_TRUNC('month', i.InvoiceDate) AS DATE) AS month_start
+    FROM Invoice i
+    JOIN InvoiceLine il ON i.InvoiceId = il.InvoiceId
+    {joins}
+    {where}
+    ORDER BY i.CustomerId, dt, i.InvoiceId
+"""
+
+@lru_cache(maxsize=128)
+def _events_table_sql(where_sql: str) -> str:
+    """
+    Builds the filtered_invoices statement for one WHERE skeleton.
+
+    Values are bound as '?' parameters, so the text only depends on which
+    filters are active and is built once per skeleton.
+    """
+    # Skip dimension joins no clause filters on (e.g. date/country only)
+    used = set(re.findall(r"\b(t|al|ar|g)\.", where_sql))
+    joins_sql = "\n    ".join(
+        join for aliases, join in _EVENT_JOINS if used.intersection(aliases)
+    )
+    return _EVENTS_TABLE_TEMPLATE.format(joins=joins_sql, where=where_sql)
 
 def get_events_shared(
     conn: DuckDBPyConnection,
-    where_clauses: List[str],
-    previous_hash: Optional[str] = None
+    where_clauses: Union[str, Sequence[str]],
+    previous_hash: Optional[str] = None,
+    params: Optional[Sequence[Any]] = None
 ) -> str:
     """
-    Fetches filtered invoice metadata and stores it as a temp DuckDB table only
-    if the hash has changed.
+    Materializes filtered invoice metadata as the temp DuckDB table
+    filtered_invoices and returns the fingerprint of its InvoiceId set.
+
+    The table carries CustomerId, dt, InvoiceId and month_start (first day of
+    the invoice month) so monthly rollups can group on a native DATE.
 
     Parameters:
         conn (DuckDBPyConnection): DuckDB connection object
-        where_clauses (List[str]): SQL filter clauses (artist, genre, country)
-        previous_hash (str, optional): Prior hash of InvoiceId set
+        where_clauses (str | List[str]): SQL filter clauses (artist, genre,
+            country), or an already joined "WHERE ..." string
+            (see build_where_sql)
+        previous_hash (str, optional): Prior hash of InvoiceId set, used to
+            report whether the subset changed
+        params (List[Any], optional): Values for '?' placeholders in
+            where_clauses (see form_where_clause_params)
 
     Returns:
         Str: The new hash signature.
     """
     log_msg("[SQL CORE] Running get_events_shared()")
 
-    where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
-
-    query = f"""
-        SELECT
-            i.CustomerId,
-            DATE(i.InvoiceDate) AS dt,
-            i.InvoiceId
-        FROM Invoice i
-        JOIN InvoiceLine il ON i.InvoiceId = il.InvoiceId
-        JOIN Track t ON il.TrackId = t.TrackId
-        JOIN Album al ON t.AlbumId = al.AlbumId
-        JOIN Artist ar ON al.ArtistId = ar.ArtistId
-        JOIN Genre g ON t.GenreId = g.GenreId
-        {where_sql}
-    """
+    if isinstance(where_clauses, str):
+        where_sql = where_clauses
+    else:
+        where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
 
-    df = conn.execute(query).fetchdf()
-    log_msg(
-        f"     [SQL CORE] Raw query returned {len(df)} rows before deduplication."
-        )
-
-    df_cleaned = (
-        df.drop_duplicates(subset=["CustomerId", "InvoiceId", "dt"])
-          .sort_values(["CustomerId", "dt"])
+    conn.execute(
+        _events_table_sql(where_sql),
+        [list(p) if isinstance(p, tuple) else p for p in params or ()]
     )
 
+    # Fingerprint and counts for the log line come from one scan
+    new_hash, num_rows, num_invoices = conn.execute(
+        _FILTERED_IDS_HASH_SQL
+    ).fetchone()
     log_msg(
-        f"     [SQL CORE] {len(df_cleaned)} cleaned rows across {df_cleaned['InvoiceId'].nunique()} invoices"
+        "     [SQL CORE] %d cleaned rows across %d invoices",
+        args=(num_rows, num_invoices)
         )
 
-    new_hash = hash_invoice_ids(df_cleaned)
-
     if new_hash == previous_hash:
-        existing_tables = {row[0] for row in conn.execute("SHOW TABLES").fetchall()}
-        if "filtered_invoices" in existing_tables:
-            log_msg(f"     [SQL CORE] Skipping update: hash matched ({new_hash})")
-            return None, new_hash
-
-        log_msg("     [SQL CORE] Table missing — materializing filtered_invoices.")
-
-    conn.register("df_cleaned", df_cleaned)
-    conn.execute("CREATE OR REPLACE TEMP TABLE filtered_invoices AS SELECT * FROM df_cleaned")
-    conn.unregister("df_cleaned")
-
-    log_msg("     [SQL CORE] Temp table 'filtered_invoices' updated successfully")
+        log_msg(f"     [SQL CORE] Subset unchanged: hash matched ({new_hash})")
+    else:
+        log_msg("     [SQL CORE] Temp table 'filtered_invoices' updated successfully")
 
-    return new_hash
\ No newline at end of file
+    return new_hash
@@ -6,11 +6,57 @@ Used for dynamic query composition in shared or page-specific queries.
 Includes helpers for invoice joins and date filtering.
 """
 
-from typing import List, Optional
-import pandas as pd
+import calendar
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
 from services.logging_utils import log_msg
 
 
+# The dashboard's active range rarely changes between callbacks, so the
+# parsed bounds are memoized per (start, end)
+@lru_cache(maxsize=256)
+def month_window(start: Any, end: Any) -> Tuple[date, date]:
+    """
+    Widens a date range to whole months: the first day of start's month
+    and the last day of end's month.
+
+    Parameters:
+        start, end: ISO dates ("YYYY-MM-DD"); any hashable value whose
+            str() begins with one (e.g. a Timestamp) is accepted
+
+    Returns:
+        Tuple[date, date]: Month-aligned (start, end)
+    """
+    first = date.fromisoformat(str(start)[:10]).replace(day=1)
+    last = date.fromisoformat(str(end)[:10])
+    last = last.replace(day=calendar.monthrange(last.year, last.month)[1])
+    return first, last
+
+
+# Half-open [first day, day after last day) window on the raw InvoiceDate
+# column: prunable by DuckDB's min/max zone maps, where DATE(...) would be
+# evaluated per row
+INVOICE_DATE_WINDOW_SQL = "i.InvoiceDate >= ? AND i.InvoiceDate < ?"
+
+
+def invoice_date_window(date_range: Optional[List[str]]) -> Tuple[str, List[date]]:
+    """
+    Builds the month-aligned invoice date predicate and its parameters.
+
+    Parameters:
+        date_range (Optional[List[str]]): Date range as ["YYYY-MM-DD", "YYYY-MM-DD"]
+
+    Returns:
+        Tuple[str, List[date]]: INVOICE_DATE_WINDOW_SQL and its two bounds,
+        or ("", []) when no complete range is given
+    """
+    if date_range and len(date_range) == 2:
+        start, end = month_window(*date_range)
+        return INVOICE_DATE_WINDOW_SQL, [start, end + timedelta(days=1)]
+    return "", []
+
+
 def escape_in_list(values: List[str]) -> str:
     """
     Escapes and formats a list of strings for use in SQL IN clauses.
@@ -45,23 +91,77 @@ def form_where_clause(
     log_msg("[SQL FILTERS] Forming WHERE clause.")
     clauses = []
 
-    if date_range and len(date_range) == 2:
-        start = pd.to_datetime(date_range[0]).to_period("M").start_time.date()
-        end = pd.to_datetime(date_range[1]).to_period("M").end_time.date()
-        clauses.append(f"DATE(i.InvoiceDate) BETWEEN DATE('{start}') AND DATE('{end}')")
-
-    if country:
-        clauses.append(f"i.BillingCountry IN ('{escape_in_list(country)}')")
+    # Most selective first: artist, genre, country, then the date range
+    if artist:
+        clauses.append(f"ar.Name IN ('{escape_in_list(artist)}')")
 
     if genre:
         clauses.append(f"g.Name IN ('{escape_in_list(genre)}')")
 
-    if artist:
-        clauses.append(f"ar.Name IN ('{escape_in_list(artist)}')")
+    if country:
+        clauses.append(f"i.BillingCountry IN ('{escape_in_list(country)}')")
+
+    if date_range and len(date_range) == 2:
+        start, end = month_window(*date_range)
+        clauses.append(f"DATE(i.InvoiceDate) BETWEEN DATE('{start}') AND DATE('{end}')")
 
     return clauses
 
 
+# Above this many values, form_where_clause_params() binds an IN-list as a
+# single list parameter instead of one placeholder per value
+_MAX_INLINE_IN = 16
+
+def form_where_clause_params(
+    date_range: Optional[List[str]] = None,
+    country: Optional[List[str]] = None,
+    genre: Optional[List[str]] = None,
+    artist: Optional[List[str]] = None
+) -> Tuple[List[str], List[Any]]:
+    """
+    Builds the same WHERE clause fragments as form_where_clause(), with '?'
+    placeholders in place of inlined values.
+
+    Filter values are bound at execute time instead of escaped into the SQL,
+    so DuckDB sees one statement shape per combination of filter sizes.
+    Selections longer than _MAX_INLINE_IN become a semi-join against one
+    bound list, which keeps a single shape however many values are picked.
+
+    Parameters:
+        date_range (Optional[List[str]]): Date range as ["YYYY-MM-DD", "YYYY-MM-DD"]
+        country (Optional[List[str]]): List of selected countries
+        genre (Optional[List[str]]): List of selected genres
+        artist (Optional[List[str]]): List of selected artists
+
+    Returns:
+        Tuple[List[str], List[Any]]: SQL fragments to be joined with 'AND',
+        and their parameters in order
+    """
+    log_msg("[SQL FILTERS] Forming parameterized WHERE clause.")
+    clauses, params = [], []
+
+    # Same most-selective-first order as form_where_clause()
+    for column, values in (
+        ("ar.Name", artist), ("g.Name", genre), ("i.BillingCountry", country)
+    ):
+        if not values:
+            continue
+        if len(values) > _MAX_INLINE_IN:
+            # Long selections bind as one list, planned as a hash semi-join
+            clauses.append(f"{column} IN (SELECT UNNEST(CAST(? AS VARCHAR[])))")
+            params.append([str(v) for v in values])
+        else:
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(str(v) for v in values)
+
+    date_sql, date_params = invoice_date_window(date_range)
+    if date_sql:
+        clauses.append(date_sql)
+        params.extend(date_params)
+
+    return clauses, params
+
+
 def apply_date_filter(date_range: Optional[List[str]]) -> str:
     """
     Constructs a standardized SQL JOIN clause between event and invoice tables,
@@ -77,8 +177,7 @@ def apply_date_filter(date_range: Optional[List[str]]) -> str:
     log_msg("[SQL FILTERS] Forming date filter.")
     
     if date_range and len(date_range) == 2:
-        start = pd.to_datetime(date_range[0]).to_period("M").start_time.date()
-        end = pd.to_datetime(date_range[1]).to_period("M").end_time.date()
+        start, end = month_window(*date_range)
 
         return (
             f"JOIN Invoice i ON i.InvoiceId = e.InvoiceId "
@@ -86,3 +185,31 @@ def apply_date_filter(date_range: Optional[List[str]]) -> str:
         )
 
     return "JOIN Invoice i ON i.InvoiceId = e.InvoiceId"
+
+
+@lru_cache(maxsize=128)
+def build_where_sql(
+    date_range: Optional[Tuple[str, str]] = None,
+    country: Tuple[str, ...] = (),
+    genre: Tuple[str, ...] = (),
+    artist: Tuple[str, ...] = ()
+) -> Tuple[str, Tuple[Any, ...]]:
+    """
+    Joins form_where_clause_params() output into a ready WHERE clause,
+    memoized per filter selection.
+
+    Parameters:
+        date_range (Optional[Tuple[str, str]]): ("YYYY-MM-DD", "YYYY-MM-DD")
+        country, genre, artist (Tuple[str, ...]): Selected values
+
+    Returns:
+        Tuple[str, Tuple[Any, ...]]: "WHERE ..." (or "" with no filters) and
+        its parameters in order
+    """
+    clauses, params = form_where_clause_params(
+        date_range=list(date_range) if date_range else None,
+        country=list(country), genre=list(genre), artist=list(artist)
+    )
+    where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    # Tuples all the way down, so cached results cannot be mutated
+    return where_sql, tuple(tuple(p) if isinstance(p, list) else p for p in params)
@@ -6,6 +6,10 @@ from unittest.mock import MagicMock
 from services import cache_config
 from services.db import get_connection
 
+def pytest_configure(config):
+    """Registers custom markers (select with -m "not slow")."""
+    config.addinivalue_line("markers", "slow: longer retention/KPI tests")
+
 @pytest.fixture(scope="session")
 def duckdb_conn():
     """Provides a shared DuckDB connection for tests."""
@@ -23,14 +27,29 @@ def is_dev_env():
     from config import IS_DEV
     return IS_DEV
 
+def _no_memoize(*args, **kwargs):
+    """Pass-through replacement for cache.memoize."""
+    return lambda f: f
+
+# Disable Flask-Caching decorators at import, before test modules are
+# collected, so every memoized function is imported uncached
+cache_config.cache.memoize = _no_memoize
+
 @pytest.fixture(autouse=True)
-def disable_cache():
-    """Disable Flask-Caching decorators during tests."""
-    cache_config.cache.memoize = lambda *args, **kwargs: (lambda f: f)
+def isolate_duckdb_state(duckdb_conn):
+    """
+    Runs each test inside a transaction that is rolled back afterwards.
 
-@pytest.fixture(scope="function")
+    Temp tables a test creates, replaces or drops (filtered_invoices, the
+    catalog tables) revert to the session state set up outside of it.
+    """
+    duckdb_conn.execute("BEGIN")
+    yield
+    duckdb_conn.execute("ROLLBACK")
+
+@pytest.fixture(scope="session")
 def prepare_full_data_context(duckdb_conn):
-    """Prepare DuckDB with full dataset and catalog tables."""
+    """Prepare DuckDB with full dataset and catalog tables, once per session."""
     from services.sql_core import get_events_shared
     from services.metadata import create_catalog_tables
 
@@ -44,8 +63,27 @@ def prepare_empty_artist_context(duckdb_conn):
     from services.sql_core import get_events_shared
     from services.metadata import create_catalog_tables
 
+    # Runs inside the test transaction, so the full context comes back after
     where_clauses = ["ar.Name = 'A Cor Do Som'"]
     get_events_shared(duckdb_conn, where_clauses)
     create_catalog_tables(duckdb_conn)
     return duckdb_conn
 
+@pytest.fixture(scope="session")
+def cohort_frames(prepare_full_data_context):
+    """Cohort retention frames for the full dataset, computed once per range."""
+    from services.kpis.retention import get_retention_cohort_data
+
+    conn = prepare_full_data_context
+    return {
+        date_range: get_retention_cohort_data(conn, list(date_range))
+        for date_range in (
+            ("2009-01-01", "2013-12-31"),
+            ("2010-01-01", "2010-12-31"),
+        )
+    }
+
+@pytest.fixture(scope="function")
+def cohort_full_range(prepare_full_data_context, cohort_frames):
+    """Full-range cohort frame; a copy so tests cannot alter the cached one."""
+    return cohort_frames[("2009-01-01", "2013-12-31")].copy()
@@ -4,11 +4,7 @@ import pytest
 from unittest.mock import MagicMock
 import sys
 
-# Patch cache.memoize BEFORE importing cached_funs
-from services import cache_config
-cache_config.cache.memoize = lambda *args, **kwargs: (lambda f: f)
-
-# Now import the functions
+# cache.memoize is patched to a no-op in conftest before this import
 from services.cached_funs import (
     get_retention_cohort_data_cached,
     get_shared_kpis_cached
@@ -50,6 +50,73 @@ def test_duckdb_connection_creation(monkeypatch):
     conn = db.get_connection()
     assert conn.execute("SELECT 1")[0][0] == 1
 
+def test_duckdb_connection_reused(monkeypatch):
+    """Test that repeat get_connection() calls return the same connection."""
+    from services import db
+
+    monkeypatch.setattr(db, "_conn", None)
+    monkeypatch.setattr(os.path, "exists", lambda path: True)
+
+    class DummyConn:
+        def execute(self, query): return [(1,)]
+
+    calls = []
+    def fake_connect(path, read_only):
+        calls.append(path)
+        return DummyConn()
+
+    monkeypatch.setattr(duckdb, "connect", fake_connect)
+
+    first = db.get_connection()
+    assert db.get_connection() is first
+    assert len(calls) == 1
+
+def test_duckdb_connection_single_under_threads(monkeypatch):
+    """Test that concurrent first calls to get_connection() connect only once."""
+    import threading
+    import time
+    from services import db
+
+    monkeypatch.setattr(db, "_conn", None)
+    monkeypatch.setattr(os.path, "exists", lambda path: True)
+
+    class DummyConn:
+        def execute(self, query): return [(1,)]
+
+    calls = []
+    def slow_connect(path, read_only):
+        calls.append(path)
+        time.sleep(0.05)
+        return DummyConn()
+
+    monkeypatch.setattr(duckdb, "connect", slow_connect)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(db.get_connection()))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+def test_borrow_cursor_returns_to_pool(duckdb_conn, monkeypatch):
+    """Test that a borrowed cursor can read base tables and is handed back."""
+    from services import db
+
+    monkeypatch.setattr(db, "_conn", duckdb_conn)
+    monkeypatch.setattr(db, "_cursor_pool", None)
+
+    with db.borrow_cursor() as cur:
+        assert cur.execute("SELECT COUNT(*) FROM Genre").fetchone()[0] > 0
+        assert db._cursor_pool.qsize() == db._CURSOR_POOL_SIZE - 1
+
+    assert db._cursor_pool.qsize() == db._CURSOR_POOL_SIZE
+
 def test_missing_duckdb_file_real_logging(monkeypatch, caplog):
     """Ensure real log_msg is executed when DB file is missing."""
     from services import db
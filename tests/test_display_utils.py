@@ -4,8 +4,11 @@ import pytest
 import pandas as pd
 from services.display_utils import (
     format_kpi_value,
+    format_kpi_series,
+    format_kpi_array,
     standardize_country_to_iso3,
     flagify_country,
+    flagify_country_many,
     safe_kpi_entry,
     safe_kpi_card,
     make_static_kpi_card,
@@ -52,6 +55,35 @@ def test_flagify_country_invalid():
     """Test flagify_country returns 'NA' for unknown input."""
     assert flagify_country("Unknownland") == "NA"
 
+def test_format_kpi_value_missing_and_invalid():
+    """Test that None, NaN and non-numeric inputs format as 'NA'."""
+    assert format_kpi_value(None, value_type="number") == "NA"
+    assert format_kpi_value(float("nan"), value_type="dollar") == "NA"
+    assert format_kpi_value("abc", value_type="float") == "NA"
+
+def test_format_kpi_series_matches_scalar():
+    """Test that format_kpi_series agrees with format_kpi_value per element."""
+    s = pd.Series([1234.567, float("nan"), 1000000], index=[3, 1, 2])
+    for vt in ("dollar", "percent", "number", "float"):
+        out = format_kpi_series(s, value_type=vt)
+        assert list(out.index) == [3, 1, 2]
+        assert out.tolist() == [format_kpi_value(v, value_type=vt) for v in s]
+
+def test_format_kpi_array_matches_scalar():
+    """Test that format_kpi_array agrees with format_kpi_value, None included."""
+    values = [42, None, 0.1234, 15000]
+    for vt in ("dollar", "percent", "number", "float"):
+        out = format_kpi_array(values, value_type=vt, accuracy=1)
+        assert out == [format_kpi_value(v, value_type=vt, accuracy=1) for v in values]
+    with pytest.raises(ValueError):
+        format_kpi_array(values, value_type="country")
+
+def test_flagify_country_many_matches_scalar():
+    """Test that the batch flag helper agrees with flagify_country."""
+    names = ["US", "Brazil", None, "Unknownland", "US"]
+    expected = [flagify_country(n, label=True) for n in names]
+    assert flagify_country_many(names, label=True) == expected
+
 def test_safe_kpi_entry_valid():
     """Test safe_kpi_entry returns correct label and value."""
     entry = safe_kpi_entry("Revenue", "$1000")
@@ -97,6 +129,17 @@ def test_make_static_kpi_card_empty():
     card = make_static_kpi_card({}, specs, title="Empty KPIs")
     assert "No data available" in str(card)
 
+def test_make_static_kpi_card_reuses_identical_cards():
+    """Test that identical static cards are served from the card cache."""
+    specs = [{"label": "Revenue", "key_path": ["Revenue"], "fmt": True}]
+    first = make_static_kpi_card({"Revenue": "$5.00"}, specs, title="Cached")
+    again = make_static_kpi_card({"Revenue": "$5.00"}, specs, title="Cached")
+    other = make_static_kpi_card({"Revenue": "$6.00"}, specs, title="Cached")
+
+    assert again is first
+    assert other is not first
+    assert "$6.00" in str(other)
+
 def test_make_topn_kpi_card_valid():
     """Test make_topn_kpi_card renders top-N entries correctly."""
     kpis = {
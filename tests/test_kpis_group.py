@@ -4,6 +4,7 @@ import pytest
 import pandas as pd
 from services.kpis.group import (
     get_group_kpis_full,
+    get_group_kpis_all,
     topn_kpis_slice_topn,
     topn_kpis_generate,
     topn_kpis_format_display,
@@ -19,6 +20,14 @@ def test_get_group_kpis_full_genre(prepare_full_data_context):
     assert "revenue" in df.columns
     assert df["group_val"].nunique() == 24
 
+def test_get_group_kpis_all_matches_full(prepare_full_data_context):
+    conn = prepare_full_data_context
+    date_range = ["2010-01-01", "2010-12-31"]
+    result = get_group_kpis_all(conn, date_range)
+    for group_var in ["Genre", "Artist", "BillingCountry"]:
+        expected = get_group_kpis_full(conn, group_var, date_range)
+        pd.testing.assert_frame_equal(result[group_var], expected)
+
 def test_topn_kpis_slice_topn_basic():
     df = pd.DataFrame({
         "group_val": ["A", "B", "C", "D", "E"],
@@ -119,3 +128,13 @@ def test_enrich_catalog_kpis_artist(prepare_full_data_context):
     enriched = enrich_catalog_kpis(conn, topn, "Artist", ["2009-01-01", "2013-12-31"])
     assert "catalog_size" in enriched.columns
     assert "pct_catalog_sold" in enriched.columns
+
+def test_enrich_catalog_kpis_reuses_catalog_df(prepare_full_data_context):
+    conn = prepare_full_data_context
+    date_range = ["2009-01-01", "2013-12-31"]
+    df = get_group_kpis_full(conn, "Genre", date_range)
+    topn = topn_kpis_slice_topn(df, "revenue", n=5)
+    catalog_df = query_catalog_sales(conn, "Genre", date_range)
+    reused = enrich_catalog_kpis(conn, topn, "Genre", date_range, catalog_df=catalog_df)
+    fresh = enrich_catalog_kpis(conn, topn, "Genre", date_range)
+    pd.testing.assert_frame_equal(reused, fresh)
@@ -4,131 +4,146 @@ import pytest
 import pandas as pd
 from services.kpis.retention import get_retention_cohort_data
 
-def test_retention_cohort_full_range(prepare_full_data_context):
-    """Test full-range cohort metrics match expected structure and values."""
-    conn = prepare_full_data_context
-    date_range = ["2009-01-01", "2013-12-31"]
-    df = get_retention_cohort_data(conn, date_range)
+# (date_range, expected): row count plus the first and last rows as
+# (cohort_month, month_offset, num_active_customers, cohort_size, retention_pct)
+COHORT_CASES = [
+    (
+        ("2009-01-01", "2013-12-31"),
+        {
+            "num_rows": 304,
+            "first": ("2009-01-01", 1, 1, 6, 0.1667),
+            "last": ("2010-07-01", 41, 1, 1, 1.0),
+        },
+    ),
+    (
+        ("2010-01-01", "2010-12-31"),
+        {
+            "num_rows": 65,
+            "first": ("2009-01-01", 18, 1, 6, 0.1667),
+            "last": ("2010-07-01", 3, 1, 1, 1.0),
+        },
+    ),
+]
+
+@pytest.mark.slow
+@pytest.mark.parametrize(
+    "date_range, expected", COHORT_CASES, ids=["full_range", "2010_only"]
+)
+def test_retention_cohort(cohort_frames, date_range, expected):
+    """Test cohort metrics match expected structure and values per range."""
+    df = cohort_frames[date_range]
 
     assert isinstance(df, pd.DataFrame)
-    assert df.shape[0] == 304
+    assert df.shape[0] == expected["num_rows"]
     assert list(df.columns) == [
         "cohort_month", "month_offset", "num_active_customers",
         "cohort_size", "retention_pct"
     ]
 
-    # First cohort: Jan 2009, offset 1
-    first = df[(df["cohort_month"] == "2009-01-01") & (df["month_offset"] == 1)]
-    assert first["num_active_customers"].values[0] == 1
-    assert first["cohort_size"].values[0] == 6
-    assert first["retention_pct"].values[0] == pytest.approx(0.1667, rel=1e-4)
-
-    # Last cohort: Jul 2010, offset 41
-    last = df[(df["cohort_month"] == "2010-07-01") & (df["month_offset"] == 41)]
-    assert last["num_active_customers"].values[0] == 1
-    assert last["cohort_size"].values[0] == 1
-    assert last["retention_pct"].values[0] == pytest.approx(1.0)
-
-def test_retention_cohort_2010_only(prepare_full_data_context):
-    """Test 2010-only cohort metrics match expected structure and values."""
-    conn = prepare_full_data_context
-    date_range = ["2010-01-01", "2010-12-31"]
-    df = get_retention_cohort_data(conn, date_range)
-
-    assert isinstance(df, pd.DataFrame)
-    assert df.shape[0] == 65
-    assert list(df.columns) == [
-        "cohort_month", "month_offset", "num_active_customers",
-        "cohort_size", "retention_pct"
-    ]
-
-    # First row: cohort Jan 2009, offset 18
-    first = df.iloc[0]
-    assert str(first["cohort_month"])[:10] == "2009-01-01"
-    assert first["month_offset"] == 18
-    assert first["num_active_customers"] == 1
-    assert first["cohort_size"] == 6
-    assert first["retention_pct"] == pytest.approx(0.1667, rel=1e-4)
-
-    # Last row: cohort Jul 2010, offset 3
-    last = df.iloc[-1]
-    assert str(last["cohort_month"])[:10] == "2010-07-01"
-    assert last["month_offset"] == 3
-    assert last["num_active_customers"] == 1
-    assert last["cohort_size"] == 1
-    assert last["retention_pct"] == pytest.approx(1.0)
+    for row, (month, offset, active, size, pct) in (
+        (df.iloc[0], expected["first"]), (df.iloc[-1], expected["last"])
+    ):
+        assert str(row["cohort_month"])[:10] == month
+        assert row["month_offset"] == offset
+        assert row["num_active_customers"] == active
+        assert row["cohort_size"] == size
+        assert row["retention_pct"] == pytest.approx(pct, rel=1e-4)
 
 import pytest
 from services.kpis.retention import get_retention_cohort_data, get_retention_kpis
 
-def test_retention_kpis_full_range(prepare_full_data_context):
-    """Test full-range retention KPIs match expected values."""
-    conn = prepare_full_data_context
-    date_range = ["2009-01-01", "2013-12-31"]
-    cohort_df = get_retention_cohort_data(conn, date_range)
-    result = get_retention_kpis(conn, date_range, cohort_df)
-
-    assert result["num_cust"] == "59"
-    assert result["num_new"] == "59"
-    assert result["pct_new"] == "100.00%"
-    assert result["ret_n_any"] == "59"
-    assert result["ret_rate_any"] == "100.00%"
-    assert result["ret_n_return"] == "0"
-    assert result["ret_rate_return"] == "NA"
-    assert result["ret_n_conv"] == "59"
-    assert result["ret_rate_conv"] == "100.00%"
-    assert result["ret_n_window"] == "59"
-    assert result["ret_rate_window"] == "100.00%"
-    assert result["avg_life_mo_tot"] == "46.03"
-    assert result["avg_life_mo_win"] == "46.03"
-    assert result["med_gap_life"] == "94.00"
-    assert result["med_gap_window"] == "94.00"
-    assert result["med_gap_winback"] == "NA"
-    assert result["med_gap_ret"] == "NA"
-    assert result["avg_gap_life"] == "234.61"
-    assert result["avg_gap_window"] == "234.61"
-    assert result["avg_gap_bound"] == "234.61"
-    assert result["top_cohort_month_3"] == "Jul 2010"
-    assert result["top_cohort_retention_3"] == "100.00%"
-    assert result["top_cohort_month_6"] == "Jul 2010"
-    assert result["top_cohort_retention_6"] == "100.00%"
-    assert result["top_cohort_month_9"] == "Sep 2009"
-    assert result["top_cohort_retention_9"] == "50.00%"
-
-def test_retention_kpis_2010_only(prepare_full_data_context):
-    """Test 2010-only retention KPIs match expected values."""
+EXPECTED_KPIS_FULL = {
+    "num_cust": "59",
+    "num_new": "59",
+    "pct_new": "100.00%",
+    "ret_n_any": "59",
+    "ret_rate_any": "100.00%",
+    "ret_n_return": "0",
+    "ret_rate_return": "NA",
+    "ret_n_conv": "59",
+    "ret_rate_conv": "100.00%",
+    "ret_n_window": "59",
+    "ret_rate_window": "100.00%",
+    "avg_life_mo_tot": "46.03",
+    "avg_life_mo_win": "46.03",
+    "med_gap_life": "94.00",
+    "med_gap_window": "94.00",
+    "med_gap_winback": "NA",
+    "med_gap_ret": "NA",
+    "avg_gap_life": "234.61",
+    "avg_gap_window": "234.61",
+    "avg_gap_bound": "234.61",
+    "cust_line": "59 (100.00%)",
+    "ret_any_line": "59 (100.00%)",
+    "ret_return_line": "0 (NA)",
+    "ret_conv_line": "59 (100.00%)",
+    "ret_window_line": "59 (100.00%)",
+    "top_cohort_month_3": "Jul 2010",
+    "top_cohort_retention_3": "100.00%",
+    "top_cohort_line_3": "Jul 2010 (100.00%)",
+    "top_cohort_month_6": "Jul 2010",
+    "top_cohort_retention_6": "100.00%",
+    "top_cohort_line_6": "Jul 2010 (100.00%)",
+    "top_cohort_month_9": "Sep 2009",
+    "top_cohort_retention_9": "50.00%",
+    "top_cohort_line_9": "Sep 2009 (50.00%)",
+}
+
+EXPECTED_KPIS_2010 = {
+    "num_cust": "46",
+    "num_new": "13",
+    "pct_new": "28.26%",
+    "ret_n_any": "46",
+    "ret_rate_any": "100.00%",
+    "ret_n_return": "33",
+    "ret_rate_return": "100.00%",
+    "ret_n_conv": "13",
+    "ret_rate_conv": "100.00%",
+    "ret_n_window": "27",
+    "ret_rate_window": "58.70%",
+    "avg_life_mo_tot": "44.28",
+    "avg_life_mo_win": "10.22",
+    "med_gap_life": "94.00",
+    "med_gap_window": "94.00",
+    "med_gap_winback": "243.00",
+    "med_gap_ret": "391.50",
+    "avg_gap_life": "225.97",
+    "avg_gap_window": "107.17",
+    "avg_gap_bound": "285.14",
+    "cust_line": "46 (28.26%)",
+    "ret_any_line": "46 (100.00%)",
+    "ret_return_line": "33 (100.00%)",
+    "ret_conv_line": "13 (100.00%)",
+    "ret_window_line": "27 (58.70%)",
+    "top_cohort_month_3": "Jul 2010",
+    "top_cohort_retention_3": "100.00%",
+    "top_cohort_line_3": "Jul 2010 (100.00%)",
+    "top_cohort_month_6": "Sep 2009",
+    "top_cohort_retention_6": "50.00%",
+    "top_cohort_line_6": "Sep 2009 (50.00%)",
+    "top_cohort_month_9": "Sep 2009",
+    "top_cohort_retention_9": "50.00%",
+    "top_cohort_line_9": "Sep 2009 (50.00%)",
+}
+
+KPI_CASES = [
+    (("2009-01-01", "2013-12-31"), EXPECTED_KPIS_FULL),
+    (("2010-01-01", "2010-12-31"), EXPECTED_KPIS_2010),
+]
+
+@pytest.mark.slow
+@pytest.mark.parametrize(
+    "date_range, expected", KPI_CASES, ids=["full_range", "2010_only"]
+)
+def test_retention_kpis(prepare_full_data_context, cohort_frames, date_range, expected):
+    """Test retention KPIs match expected values per range."""
     conn = prepare_full_data_context
-    date_range = ["2010-01-01", "2010-12-31"]
-    cohort_df = get_retention_cohort_data(conn, date_range)
-    result = get_retention_kpis(conn, date_range, cohort_df)
+    cohort_df = cohort_frames[date_range].copy()
+    result = get_retention_kpis(conn, list(date_range), cohort_df)
 
-    assert result["num_cust"] == "46"
-    assert result["num_new"] == "13"
-    assert result["pct_new"] == "28.26%"
-    assert result["ret_n_any"] == "46"
-    assert result["ret_rate_any"] == "100.00%"
-    assert result["ret_n_return"] == "33"
-    assert result["ret_rate_return"] == "100.00%"
-    assert result["ret_n_conv"] == "13"
-    assert result["ret_rate_conv"] == "100.00%"
-    assert result["ret_n_window"] == "27"
-    assert result["ret_rate_window"] == "58.70%"
-    assert result["avg_life_mo_tot"] == "44.28"
-    assert result["avg_life_mo_win"] == "10.22"
-    assert result["med_gap_life"] == "94.00"
-    assert result["med_gap_window"] == "94.00"
-    assert result["med_gap_winback"] == "243.00"
-    assert result["med_gap_ret"] == "391.50"
-    assert result["avg_gap_life"] == "225.97"
-    assert result["avg_gap_window"] == "107.17"
-    assert result["avg_gap_bound"] == "285.14"
-    assert result["top_cohort_month_3"] == "Jul 2010"
-    assert result["top_cohort_retention_3"] == "100.00%"
-    assert result["top_cohort_month_6"] == "Sep 2009"
-    assert result["top_cohort_retention_6"] == "50.00%"
-    assert result["top_cohort_month_9"] == "Sep 2009"
-    assert result["top_cohort_retention_9"] == "50.00%"
+    assert result == expected
 
+@pytest.mark.slow
 def test_retention_kpis_empty_context(prepare_empty_artist_context):
     """Test retention KPIs return NA or zero values for empty dataset."""
     conn = prepare_empty_artist_context
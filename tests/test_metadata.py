@@ -2,8 +2,6 @@
 
 import pytest
 import time
-from unittest.mock import mock_open
-import json
 from services import metadata
 
 def test_get_filter_metadata_values():
@@ -39,20 +37,32 @@ def test_get_static_summary_values():
         assert not row.empty
         assert row.iloc[0]["Value"] == value
 
-def test_catalog_table_creation_and_check(duckdb_conn):
-    """Test creation and validation of catalog temp tables."""
-    metadata.create_catalog_tables(duckdb_conn)
-    assert metadata.check_catalog_tables(duckdb_conn) is True
-
-def test_catalog_table_missing_check(duckdb_conn):
-    """Test check_catalog_tables returns False when tables are missing."""
-    # Drop tables if they exist
-    duckdb_conn.execute("DROP TABLE IF EXISTS genre_catalog")
-    duckdb_conn.execute("DROP TABLE IF EXISTS artist_catalog")
-    assert metadata.check_catalog_tables(duckdb_conn) is False
-
-def test_get_last_commit_date_mock(monkeypatch):
-    """Mock GitHub cache file and test commit date retrieval."""
+def test_metadata_cache_returns_copies():
+    """Test cached metadata is shared in-process but copied per caller."""
+    metadata.invalidate_metadata_cache()
+    first = metadata.get_filter_metadata()
+    first["genres"].append("Not A Genre")
+    assert metadata.get_filter_metadata()["genres"][-1] != "Not A Genre"
+    assert "filter_metadata" in metadata._META_CACHE
+
+    metadata.invalidate_metadata_cache()
+    assert metadata._META_CACHE == {}
+
+@pytest.mark.parametrize(
+    "action, expected", [("create", True), ("drop", False)]
+)
+def test_catalog_tables(duckdb_conn, action, expected):
+    """Test check_catalog_tables after creating or dropping the catalog tables."""
+    if action == "create":
+        metadata.create_catalog_tables(duckdb_conn)
+    else:
+        # Drop tables if they exist
+        duckdb_conn.execute("DROP TABLE IF EXISTS genre_catalog")
+        duckdb_conn.execute("DROP TABLE IF EXISTS artist_catalog")
+    assert metadata.check_catalog_tables(duckdb_conn) is expected
+
+def test_get_last_commit_date_mock():
+    """Inject a fresh cache record and test commit date retrieval."""
     from services import metadata
 
     # Simulate cache content
@@ -60,20 +70,12 @@ def test_get_last_commit_date_mock(monkeypatch):
         "timestamp": str(time.time()),
         "last_updated": "Jul 20, 2025"
     }
-    fake_json = json.dumps(fake_cache)
-
-    # Patch os.path.exists to simulate cache file presence
-    monkeypatch.setattr("os.path.exists", lambda path: True)
 
-    # Patch built-in open to return fake JSON
-    m = mock_open(read_data=fake_json)
-    monkeypatch.setattr("builtins.open", m)
-
-    result = metadata.get_last_commit_date()
+    result = metadata.get_last_commit_date(cache_reader=lambda: fake_cache)
     assert result == "Jul 20, 2025"
 
 def test_get_last_commit_date_expired_cache(monkeypatch):
-    """Test that expired cache still returns last_updated value."""
+    """Test that an expired cache falls through to GitHub."""
     from services import metadata
 
     old_timestamp = str(time.time() - 999999)  # way older than 1 day
@@ -81,12 +83,11 @@ def test_get_last_commit_date_expired_cache(monkeypatch):
         "timestamp": old_timestamp,
         "last_updated": "Aug 10, 2025"
     }
-    fake_json = json.dumps(fake_cache)
 
-    monkeypatch.setattr("os.path.exists", lambda path: True)
-    m = mock_open(read_data=fake_json)
-    monkeypatch.setattr("builtins.open", m)
+    # Keep the fallback offline: the GitHub client fails to construct
+    def _no_github(*args, **kwargs):
+        raise ConnectionError("offline")
+    monkeypatch.setattr(metadata, "Github", _no_github)
 
-    result = metadata.get_last_commit_date()
+    result = metadata.get_last_commit_date(cache_reader=lambda: fake_cache)
     assert result == "Unavailable" 
-
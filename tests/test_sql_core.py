@@ -1,14 +1,20 @@
 # tests/test_sql_core.py
 
 import pytest
+import numpy as np
 import pandas as pd
 from services.sql_core import (
     get_events_shared,
     hash_invoice_ids,
+    hash_filtered_invoice_ids,
     hash_dataframe,
     hash_kpi_bundle
     )
 
+# First and last USA invoice dates
+TS_MIN = pd.Timestamp("2009-01-11")
+TS_MAX = pd.Timestamp("2013-12-05")
+
 def test_get_events_shared_with_valid_country(duckdb_conn):
     """Test that filtered_invoices contains expected rows for USA."""
     where_clauses = ["i.BillingCountry = 'USA'"]
@@ -16,13 +22,16 @@ def test_get_events_shared_with_valid_country(duckdb_conn):
 
     assert isinstance(new_hash, str)
 
-    df = duckdb_conn.execute("SELECT * FROM filtered_invoices").fetchdf()
-    assert len(df) == 91
-    assert df["CustomerId"].nunique() == 13
-    assert df["InvoiceId"].nunique() == 91
-    assert df["dt"].nunique() == 80
-    assert df["dt"].min() == pd.to_datetime("2009-01-11")
-    assert df["dt"].max() == pd.to_datetime("2013-12-05")
+    # Plain ndarrays are enough for counts and bounds; no DataFrame needed
+    arrs = duckdb_conn.execute(
+        "SELECT CustomerId, InvoiceId, dt FROM filtered_invoices"
+    ).fetchnumpy()
+    assert len(arrs["InvoiceId"]) == 91
+    assert np.unique(arrs["CustomerId"]).size == 13
+    assert np.unique(arrs["InvoiceId"]).size == 91
+    assert np.unique(arrs["dt"]).size == 80
+    assert arrs["dt"].min() == TS_MIN
+    assert arrs["dt"].max() == TS_MAX
 
 def test_get_events_shared_with_invalid_country(duckdb_conn):
     """Test that filtered_invoices is empty for nonexistent country."""
@@ -53,8 +62,28 @@ def test_get_events_shared_skips_update_if_hash_matches(duckdb_conn):
     assert isinstance(result, str) or (isinstance(result, tuple) and result[1] == hash1)
 
     # Confirm table still exists
-    tables = duckdb_conn.execute("SHOW TABLES").fetchdf()
-    assert "filtered_invoices" in tables["name"].values
+    assert duckdb_conn.execute(
+        "SELECT 1 FROM duckdb_tables() WHERE table_name = 'filtered_invoices'"
+    ).fetchone() is not None
+
+def test_get_events_shared_with_genre_and_artist(duckdb_conn):
+    """Test that genre and artist filters still join through to their tables."""
+    where_clauses = ["g.Name = 'Jazz'", "ar.Name = 'Miles Davis'"]
+    get_events_shared(duckdb_conn, where_clauses)
+    df = duckdb_conn.execute("SELECT * FROM filtered_invoices").fetchdf()
+
+    expected = duckdb_conn.execute("""
+        SELECT DISTINCT il.InvoiceId
+        FROM InvoiceLine il
+        JOIN Track t ON il.TrackId = t.TrackId
+        JOIN Album al ON t.AlbumId = al.AlbumId
+        JOIN Artist ar ON al.ArtistId = ar.ArtistId
+        JOIN Genre g ON t.GenreId = g.GenreId
+        WHERE g.Name = 'Jazz' AND ar.Name = 'Miles Davis'
+    """).fetchdf()
+
+    assert not df.empty
+    assert set(df["InvoiceId"]) == set(expected["InvoiceId"])
 
 def test_hash_invoice_ids_consistency():
     """Test that hash_invoice_ids returns consistent hash for same InvoiceId set."""
@@ -70,13 +99,21 @@ def test_hash_invoice_ids_different_order():
     df2 = pd.DataFrame({"InvoiceId": [3, 2, 1, 2]})
     assert hash_invoice_ids(df1) == hash_invoice_ids(df2)
 
+def test_hash_filtered_invoice_ids_matches_python(duckdb_conn):
+    """Test that the SQL fingerprint equals hash_invoice_ids on the same rows."""
+    for where_clauses in (["i.BillingCountry = 'USA'"], ["i.BillingCountry = 'Uzbekistan'"]):
+        new_hash = get_events_shared(duckdb_conn, where_clauses)
+        df = duckdb_conn.execute("SELECT * FROM filtered_invoices").fetchdf()
+        assert hash_filtered_invoice_ids(duckdb_conn) == hash_invoice_ids(df) == new_hash
+
 def test_hash_dataframe_consistency():
     """Test that hash_dataframe returns consistent hash for identical DataFrames."""
     df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    df2 = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})  # independent instance
     hash1 = hash_dataframe(df)
-    hash2 = hash_dataframe(df.copy())
     assert isinstance(hash1, str)
-    assert hash1 == hash2
+    assert hash1 == hash_dataframe(df)
+    assert hash1 == hash_dataframe(df2)
 
 def test_hash_dataframe_difference():
     """Test that hash_dataframe returns different hashes for different data."""
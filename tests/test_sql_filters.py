@@ -1,7 +1,11 @@
 # tests/test_sql_filters.py
 
 import pytest
-from services.sql_filters import escape_in_list, form_where_clause, apply_date_filter
+import duckdb
+from services.sql_filters import (
+    escape_in_list, form_where_clause, form_where_clause_params, build_where_sql,
+    invoice_date_window, apply_date_filter
+)
 
 def test_escape_in_list_basic():
     """Test escaping a basic list of strings for SQL IN clause."""
@@ -9,6 +13,19 @@ def test_escape_in_list_basic():
     result = escape_in_list(values)
     assert result == "US', 'Canada', 'O''Reilly"
 
+@pytest.mark.parametrize("values", [
+    ["O'Reilly"],
+    ["a, b", "c'd'e", "''", "'"],
+    ["Motörhead", "AC/DC", "Guns N' Roses"],
+    ["", "x"],
+    [f"Artist's {i}" for i in range(50)],
+])
+def test_escape_in_list_roundtrip(values):
+    """Test escaped values parse back to the originals in DuckDB."""
+    with duckdb.connect() as conn:
+        parsed = conn.execute(f"SELECT ['{escape_in_list(values)}']").fetchone()[0]
+    assert parsed == values
+
 def test_escape_in_list_empty():
     """Test escaping an empty list returns empty string."""
     assert escape_in_list([]) == ""
@@ -21,10 +38,11 @@ def test_form_where_clause_full_filters():
         genre=["Rock"],
         artist=["Queen"]
     )
-    assert any("DATE(i.InvoiceDate)" in clause for clause in clauses)
-    assert any("i.BillingCountry IN" in clause for clause in clauses)
-    assert any("g.Name IN" in clause for clause in clauses)
-    assert any("ar.Name IN" in clause for clause in clauses)
+    blob = "\n".join(clauses)
+    assert "DATE(i.InvoiceDate)" in blob
+    assert "i.BillingCountry IN" in blob
+    assert "g.Name IN" in blob
+    assert "ar.Name IN" in blob
 
 def test_form_where_clause_partial_filters():
     """Test WHERE clause generation with only genre and artist."""
@@ -33,13 +51,47 @@ def test_form_where_clause_partial_filters():
         artist=["Miles Davis"]
     )
     assert len(clauses) == 2
-    assert "g.Name IN" in clauses[0]
-    assert "ar.Name IN" in clauses[1]
+    assert "ar.Name IN" in clauses[0]
+    assert "g.Name IN" in clauses[1]
 
 def test_form_where_clause_empty():
     """Test WHERE clause generation with no filters returns empty list."""
     assert form_where_clause() == []
 
+def test_form_where_clause_params_binds_values():
+    """Test parameterized WHERE clauses keep values out of the SQL text."""
+    clauses, params = form_where_clause_params(
+        country=["US", "Canada"],
+        artist=["O'Reilly"]
+    )
+    assert clauses == ["ar.Name IN (?)", "i.BillingCountry IN (?, ?)"]
+    assert params == ["O'Reilly", "US", "Canada"]
+    assert form_where_clause_params() == ([], [])
+
+def test_form_where_clause_params_long_list():
+    """Test long selections bind as a single list parameter."""
+    artists = [f"Artist {i}" for i in range(40)]
+    clauses, params = form_where_clause_params(artist=artists)
+    assert clauses == ["ar.Name IN (SELECT UNNEST(CAST(? AS VARCHAR[])))"]
+    assert params == [artists]
+
+def test_invoice_date_window_month_aligned():
+    """Test the date window widens to whole months as a half-open range."""
+    sql, params = invoice_date_window(["2023-01-15", "2023-02-10"])
+    assert sql == "i.InvoiceDate >= ? AND i.InvoiceDate < ?"
+    assert [str(p) for p in params] == ["2023-01-01", "2023-03-01"]
+    assert invoice_date_window(None) == ("", [])
+
+def test_build_where_sql_joins_and_caches():
+    """Test build_where_sql returns a joined clause and reuses cached results."""
+    first = build_where_sql(country=("US", "Canada"), genre=("Rock",))
+    assert first == (
+        "WHERE g.Name IN (?) AND i.BillingCountry IN (?, ?)",
+        ("Rock", "US", "Canada")
+    )
+    assert build_where_sql(country=("US", "Canada"), genre=("Rock",)) is first
+    assert build_where_sql() == ("", ())
+
 def test_apply_date_filter_with_range():
     """Test SQL JOIN clause with date filtering."""
     clause = apply_date_filter(["2023-01-01", "2023-01-31"])